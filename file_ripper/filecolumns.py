@@ -0,0 +1,89 @@
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, List
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+STRING_CHUNK_SIZE = 4096
+
+
+class StringColumn(Sequence):
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: str = '', offsets: array = None):
+        self.data = data
+        self.offsets = offsets if offsets is not None else array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('StringColumn index out of range')
+        return self.data[self.offsets[index]:self.offsets[index + 1]]
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f'StringColumn({list(self[:10])}{"..." if len(self) > 10 else ""})'
+
+
+class ColumnBuilder:
+    def __init__(self):
+        self.values = []
+        self.chunks = []
+        self.offsets = array('q', [0])
+        self.length = 0
+        self.strings_only = True
+
+    def append(self, value):
+        if self.strings_only and not isinstance(value, str):
+            self.values = list(self.build_strings())
+            self.chunks = []
+            self.strings_only = False
+
+        self.values.append(value)
+        if self.strings_only:
+            self.length += len(value)
+            self.offsets.append(self.length)
+            if len(self.values) >= STRING_CHUNK_SIZE:
+                self.chunks.append(''.join(self.values))
+                self.values = []
+
+    def build_strings(self) -> StringColumn:
+        return StringColumn(''.join(self.chunks) + ''.join(self.values), self.offsets)
+
+    def build(self):
+        if self.strings_only:
+            return self.build_strings()
+        return compact_column(self.values)
+
+
+def create_columns(field_names: List[str], records: Iterable[dict]) -> dict:
+    builders = [ColumnBuilder() for _ in field_names]
+    column_appends = [(builder.append, field_name) for builder, field_name in zip(builders, field_names)]
+    for record in records:
+        for append, field_name in column_appends:
+            append(record[field_name])
+
+    return {field_name: builder.build() for field_name, builder in zip(field_names, builders)}
+
+
+def compact_column(values: list):
+    try:
+        if values and all(type(value) is int for value in values):
+            return numpy.array(values, dtype=numpy.int64) if numpy is not None else array('q', values)
+        if values and all(type(value) is float for value in values):
+            return numpy.array(values, dtype=numpy.float64) if numpy is not None else array('d', values)
+    except OverflowError:
+        pass
+    return values
@@ -30,3 +30,37 @@ OUTPUT_FILE_PATH = 'output_file_path'
 HTTP_HEADERS = 'http_headers'
 COLLECTION_NAME = 'collection_name'
 DATABASE_NAME = 'database_name'
+BATCH_SIZE = 'batch_size'
+MAX_BATCH_BYTES = 'max_batch_bytes'
+ERROR = 'error'
+THREAD_POOL = 'THREAD'
+PROCESS_POOL = 'PROCESS'
+QUOTE_CHARACTER = 'quote_character'
+ESCAPE_CHARACTER = 'escape_character'
+WRITE_CONCERN = 'write_concern'
+HTTP_POOL_SIZE = 'http_pool_size'
+HTTP_COMPRESSION = 'http_compression'
+STREAM_RECORDS = 'stream_records'
+GZIP = 'gzip'
+MAX_IN_FLIGHT = 'max_in_flight'
+COLUMNS = 'columns'
+RECORDS_LAYOUT = 'records'
+COLUMNAR_LAYOUT = 'columnar'
+MAX_CONCURRENCY = 'max_concurrency'
+OUTPUT_FORMAT = 'output_format'
+OUTPUT_COMPRESSION = 'output_compression'
+NDJSON = 'NDJSON'
+CSV = 'CSV'
+TABLE_NAME = 'table_name'
+TRANSACTION_SIZE = 'transaction_size'
+DATA_TYPE = 'data_type'
+FORMAT = 'format'
+STRING = 'STRING'
+INTEGER = 'INTEGER'
+FLOAT = 'FLOAT'
+DECIMAL = 'DECIMAL'
+BOOLEAN = 'BOOLEAN'
+DATE = 'DATE'
+DATETIME = 'DATETIME'
+COMPACT_RECORDS = 'compact_records'
+ENCODING = 'encoding'
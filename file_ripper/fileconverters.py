@@ -0,0 +1,102 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+import fileconstants as fc
+from filecolumns import StringColumn, compact_column
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+TRUE_VALUES = frozenset(['true', 't', 'yes', 'y', '1'])
+FALSE_VALUES = frozenset(['false', 'f', 'no', 'n', '0'])
+VECTOR_DTYPES = {fc.INTEGER: 'int64', fc.FLOAT: 'float64'}
+
+
+class FieldConversionError(ValueError):
+    def __init__(self, field_name, value, data_type, record_number, position):
+        super().__init__(f'field {field_name} value {value!r} is not a valid {data_type} '
+                         f'at record {record_number}, position {position}')
+        self.field_name = field_name
+        self.value = value
+        self.data_type = data_type
+        self.record_number = record_number
+        self.position = position
+
+
+def parse_boolean(value: str) -> bool:
+    normalized = value.strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValueError(f'invalid boolean: {value}')
+
+
+def create_value_parser(data_type: str, value_format: str = ''):
+    if data_type == fc.INTEGER:
+        return int
+    if data_type == fc.FLOAT:
+        return float
+    if data_type == fc.DECIMAL:
+        return Decimal
+    if data_type == fc.BOOLEAN:
+        return parse_boolean
+    if data_type == fc.DATE:
+        return (lambda value: datetime.strptime(value, value_format).date()) if value_format else date.fromisoformat
+    if data_type == fc.DATETIME:
+        return (lambda value: datetime.strptime(value, value_format)) if value_format else datetime.fromisoformat
+    raise ValueError(f'unsupported {fc.DATA_TYPE}: {data_type}')
+
+
+class FieldConverter:
+    __slots__ = ('field_name', 'data_type', 'position', 'parse', 'vector_dtype')
+
+    def __init__(self, field_definition, position):
+        self.field_name = field_definition.field_name
+        self.data_type = field_definition.data_type
+        self.position = position
+        self.parse = create_value_parser(field_definition.data_type, field_definition.format)
+        self.vector_dtype = VECTOR_DTYPES.get(field_definition.data_type)
+
+    def convert(self, value, record_number):
+        if value is None or value == '':
+            return None
+        try:
+            return self.parse(value)
+        except (ValueError, ArithmeticError, TypeError):
+            raise FieldConversionError(self.field_name, value, self.data_type, record_number, self.position) from None
+
+    def convert_column(self, column):
+        if self.vector_dtype and numpy is not None and isinstance(column, StringColumn):
+            try:
+                return numpy.array(list(column)).astype(self.vector_dtype)
+            except (ValueError, OverflowError):
+                pass
+        return compact_column([self.convert(value, record_number) for record_number, value in enumerate(column, 1)])
+
+
+class RecordConverter:
+    def __init__(self, field_definitions):
+        self.converters = [FieldConverter(field_definition, get_field_position(field_definition, index))
+                           for index, field_definition in enumerate(field_definitions)
+                           if field_definition.data_type != fc.STRING]
+
+    def convert_records(self, records: Iterable[dict]) -> Iterator[dict]:
+        converters = [(converter.field_name, converter.convert) for converter in self.converters]
+        for record_number, record in enumerate(records, 1):
+            for field_name, convert in converters:
+                record[field_name] = convert(record[field_name], record_number)
+            yield record
+
+    def convert_columns(self, columns: dict) -> dict:
+        for converter in self.converters:
+            columns[converter.field_name] = converter.convert_column(columns[converter.field_name])
+        return columns
+
+
+def get_field_position(field_definition, index):
+    return field_definition.start_position if field_definition.start_position is not None else index
@@ -1,3 +1,4 @@
+import codecs
 from os import path
 
 import fileconstants as fc
@@ -26,6 +27,31 @@ def validate_file_data(file_data):
     if fc.EXPORT_DEFINITION not in file_data:
         raise ValueError(f'{fc.EXPORT_DEFINITION} is a required property')
 
+    if fc.MAX_CONCURRENCY in file_data and (not isinstance(file_data[fc.MAX_CONCURRENCY], int)
+                                            or file_data[fc.MAX_CONCURRENCY] < 1):
+        raise ValueError(f'{fc.MAX_CONCURRENCY} must be a positive integer')
+
+    if fc.ENCODING in file_data:
+        validate_encoding(file_data[fc.ENCODING], file_data[fc.FILE_TYPE])
+
+
+def validate_encoding(encoding, file_type):
+    if file_type not in [fc.FIXED, fc.DELIMITED]:
+        raise ValueError(f'{fc.ENCODING} is only supported for {fc.FIXED} or {fc.DELIMITED} files')
+
+    try:
+        codecs.lookup(encoding)
+    except (LookupError, TypeError):
+        raise ValueError(f'unknown {fc.ENCODING}: {encoding}') from None
+
+    if '\n'.encode(encoding) != b'\n':
+        raise ValueError(f'{fc.ENCODING} must be ascii compatible to read files in binary mode: {encoding}')
+
+    # fixed positions are sliced from the raw bytes, so they only line up with characters when every byte is one
+    decoder = codecs.getincrementaldecoder(encoding)('replace')
+    if file_type == fc.FIXED and any(len(decoder.decode(bytes([byte]))) != 1 for byte in range(256)):
+        raise ValueError(f'{fc.ENCODING} must be a single-byte encoding for {fc.FIXED} files: {encoding}')
+
 
 class FieldDefinition:
     def __init__(self, file_data, file_type):
@@ -35,10 +61,17 @@ class FieldDefinition:
         if file_type == fc.FIXED and (fc.START_POSITION not in file_data or fc.FIELD_LENGTH not in file_data):
             raise ValueError('start_position and field_length are required for a fixed position file')
 
+        if file_data.get(fc.DATA_TYPE, fc.STRING) not in [fc.STRING, fc.INTEGER, fc.FLOAT, fc.DECIMAL, fc.BOOLEAN,
+                                                          fc.DATE, fc.DATETIME]:
+            raise ValueError(f'unsupported {fc.DATA_TYPE} for field {file_data[fc.FIELD_NAME]}: '
+                             f'{file_data[fc.DATA_TYPE]}')
+
         self.field_name = file_data[fc.FIELD_NAME]
         self.start_position = file_data[fc.START_POSITION] if file_type == fc.FIXED else None
         self.field_length = file_data[fc.FIELD_LENGTH] if file_type == fc.FIXED else None
         self.xml_node_name = file_data[fc.XML_NODE_NAME] if fc.XML_NODE_NAME in file_data else None
+        self.data_type = file_data[fc.DATA_TYPE] if fc.DATA_TYPE in file_data else fc.STRING
+        self.format = file_data[fc.FORMAT] if fc.FORMAT in file_data else ''
 
 
 class ExportDefinition:
@@ -56,6 +89,25 @@ class ExportDefinition:
         if file_data[fc.EXPORT_TYPE] == fc.FILE_EXPORT and fc.OUTPUT_FILE_PATH not in file_data:
             raise ValueError(f'{fc.OUTPUT_FILE_PATH} is required for {fc.EXPORT_TYPE} of {fc.FILE_EXPORT}')
 
+        if file_data.get(fc.STREAM_RECORDS) and file_data[fc.EXPORT_TYPE] not in [fc.API_EXPORT, fc.FILE_EXPORT]:
+            raise ValueError(f'{fc.STREAM_RECORDS} is only supported for {fc.EXPORT_TYPE} of {fc.API_EXPORT} '
+                             f'or {fc.FILE_EXPORT}')
+
+        if fc.OUTPUT_FORMAT in file_data and file_data[fc.OUTPUT_FORMAT] not in [fc.NDJSON, fc.CSV]:
+            raise ValueError(f'{fc.OUTPUT_FORMAT} must be {fc.NDJSON} or {fc.CSV}')
+
+        if fc.OUTPUT_COMPRESSION in file_data and file_data[fc.OUTPUT_COMPRESSION] not in ['', fc.GZIP]:
+            raise ValueError(f'{fc.OUTPUT_COMPRESSION} must be {fc.GZIP} when provided')
+
+        if fc.HTTP_COMPRESSION in file_data and file_data[fc.HTTP_COMPRESSION] not in ['', fc.GZIP]:
+            raise ValueError(f'{fc.HTTP_COMPRESSION} must be {fc.GZIP} when provided')
+
+        for size_property in [fc.BATCH_SIZE, fc.MAX_BATCH_BYTES, fc.HTTP_POOL_SIZE, fc.MAX_IN_FLIGHT,
+                              fc.TRANSACTION_SIZE]:
+            if size_property in file_data and (not isinstance(file_data[size_property], int)
+                                               or file_data[size_property] < 0):
+                raise ValueError(f'{size_property} must be a non-negative integer')
+
         self.export_type = file_data[fc.EXPORT_TYPE]
         self.api_url = file_data[fc.API_URL] if fc.API_URL in file_data else ''
         self.db_connection_string = file_data[fc.DB_CONNECTION_STRING] if fc.DB_CONNECTION_STRING in file_data else ''
@@ -63,6 +115,17 @@ class ExportDefinition:
         self.http_headers = file_data[fc.HTTP_HEADERS] if fc.HTTP_HEADERS in file_data else {}
         self.collection_name = file_data[fc.COLLECTION_NAME] if fc.COLLECTION_NAME in file_data else ''
         self.database_name = file_data[fc.DATABASE_NAME] if fc.DATABASE_NAME in file_data else ''
+        self.table_name = file_data[fc.TABLE_NAME] if fc.TABLE_NAME in file_data else ''
+        self.transaction_size = file_data[fc.TRANSACTION_SIZE] if fc.TRANSACTION_SIZE in file_data else 0
+        self.batch_size = file_data[fc.BATCH_SIZE] if fc.BATCH_SIZE in file_data else 0
+        self.max_batch_bytes = file_data[fc.MAX_BATCH_BYTES] if fc.MAX_BATCH_BYTES in file_data else 0
+        self.write_concern = file_data[fc.WRITE_CONCERN] if fc.WRITE_CONCERN in file_data else {}
+        self.http_pool_size = file_data[fc.HTTP_POOL_SIZE] if fc.HTTP_POOL_SIZE in file_data else 10
+        self.http_compression = file_data[fc.HTTP_COMPRESSION] if fc.HTTP_COMPRESSION in file_data else ''
+        self.stream_records = file_data[fc.STREAM_RECORDS] if fc.STREAM_RECORDS in file_data else False
+        self.max_in_flight = file_data[fc.MAX_IN_FLIGHT] if fc.MAX_IN_FLIGHT in file_data else 1
+        self.output_format = file_data[fc.OUTPUT_FORMAT] if fc.OUTPUT_FORMAT in file_data else fc.NDJSON
+        self.output_compression = file_data[fc.OUTPUT_COMPRESSION] if fc.OUTPUT_COMPRESSION in file_data else ''
 
 
 class FileDefinition:
@@ -77,8 +140,13 @@ class FileDefinition:
         self.completed_directory = file_data[fc.COMPLETED_DIRECTORY] if fc.COMPLETED_DIRECTORY in file_data \
             else path.join(self.input_directory, 'completed')
         self.file_description = file_data[fc.FILE_DESCRIPTION] if fc.FILE_DESCRIPTION in file_data else ''
+        self.max_concurrency = file_data[fc.MAX_CONCURRENCY] if fc.MAX_CONCURRENCY in file_data else 1
+        self.compact_records = file_data[fc.COMPACT_RECORDS] if fc.COMPACT_RECORDS in file_data else False
+        self.encoding = file_data[fc.ENCODING] if fc.ENCODING in file_data else ''
 
         self.delimiter = file_data[fc.DELIMITER] if fc.DELIMITER in file_data else ''
+        self.quote_character = file_data[fc.QUOTE_CHARACTER] if fc.QUOTE_CHARACTER in file_data else ''
+        self.escape_character = file_data[fc.ESCAPE_CHARACTER] if fc.ESCAPE_CHARACTER in file_data else ''
         self.record_element_name = file_data[fc.RECORD_ELEMENT_NAME] if file_data[fc.FILE_TYPE] == fc.XML else ''
 
         self.field_definitions = [FieldDefinition(obj, self.file_type) for obj in file_data[fc.FIELD_DEFINITIONS]]
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+DEFAULT_DUMP_INTERVAL = 60.0
+METRIC_PREFIX = 'file_ripper_'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        total = 0
+        for upper_bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            yield upper_bound, total
+
+
+class NullMetrics:
+    enabled = False
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def time(self, name, **labels):
+        return nullcontext()
+
+
+class MetricsRegistry:
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        self.buckets = buckets
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.buckets)
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def time(self, name, **labels):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - started, **labels)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': histogram.count,
+                                'sum': histogram.sum, 'buckets': dict(zip(map(str, histogram.buckets),
+                                                                          histogram.counts))}
+                               for (name, labels), histogram in sorted(self.histograms.items())]
+            }
+
+    def to_prometheus_text(self):
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f'{METRIC_PREFIX}{name}{format_labels(labels)} {value}')
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                for upper_bound, count in histogram.cumulative_counts():
+                    bucket = '+Inf' if upper_bound == float('inf') else repr(upper_bound)
+                    lines.append(f'{METRIC_PREFIX}{name}_bucket{format_labels((*labels, ("le", bucket)))} {count}')
+                lines.append(f'{METRIC_PREFIX}{name}_count{format_labels(labels)} {histogram.count}')
+                lines.append(f'{METRIC_PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+metrics = NullMetrics()
+
+
+def enable_metrics(registry=None):
+    global metrics
+    metrics = registry if registry is not None else MetricsRegistry()
+    return metrics
+
+
+def disable_metrics():
+    global metrics
+    metrics = NullMetrics()
+
+
+class PrometheusSink:
+    def __init__(self, registry: MetricsRegistry, port, host=''):
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JsonFileSink:
+    def __init__(self, registry: MetricsRegistry, file_path, interval=DEFAULT_DUMP_INTERVAL):
+        self.registry = registry
+        self.file_path = file_path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        temp_path = f'{self.file_path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.registry.to_dict(), file)
+        os.replace(temp_path, self.file_path)
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.dump()
@@ -0,0 +1,61 @@
+import bz2
+import gzip
+import io
+import os
+import zipfile
+from typing import IO, Iterator, Tuple
+
+
+GZIP_COMPRESSION = 'gzip'
+BZIP2_COMPRESSION = 'bz2'
+ZIP_COMPRESSION = 'zip'
+COMPRESSION_MAGIC = ((b'\x1f\x8b', GZIP_COMPRESSION),
+                     (b'BZh', BZIP2_COMPRESSION),
+                     (b'PK\x03\x04', ZIP_COMPRESSION),
+                     (b'PK\x05\x06', ZIP_COMPRESSION))
+COMPRESSION_EXTENSIONS = {'.gz': GZIP_COMPRESSION, '.gzip': GZIP_COMPRESSION,
+                          '.bz2': BZIP2_COMPRESSION, '.zip': ZIP_COMPRESSION}
+COMPRESSION_OPENERS = {GZIP_COMPRESSION: gzip.open, BZIP2_COMPRESSION: bz2.open}
+MAGIC_LENGTH = max(len(magic) for magic, _ in COMPRESSION_MAGIC)
+
+
+def detect_compression(file_path: str) -> str:
+    with open(file_path, 'rb') as file:
+        header = file.read(MAGIC_LENGTH)
+    for magic, compression in COMPRESSION_MAGIC:
+        if header.startswith(magic):
+            return compression
+    return ''
+
+
+def strip_compression_extension(file_name: str) -> str:
+    root, extension = os.path.splitext(file_name)
+    return root if extension.lower() in COMPRESSION_EXTENSIONS else file_name
+
+
+def get_binary_stream(file: IO) -> IO:
+    if hasattr(file, 'buffer'):
+        return file.buffer
+    if isinstance(file, io.TextIOBase):
+        raise TypeError(f'{type(file).__name__} has no binary buffer, open the file in binary mode')
+    return file
+
+
+def iter_input_files(file_path: str, encoding=None, binary=False) -> Iterator[Tuple[str, IO]]:
+    compression = detect_compression(file_path)
+    if compression == ZIP_COMPRESSION:
+        with zipfile.ZipFile(file_path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                with archive.open(member) as raw_file:
+                    if binary:
+                        yield member.filename, raw_file
+                        continue
+                    with io.TextIOWrapper(raw_file, encoding=encoding, newline='') as file:
+                        yield member.filename, file
+        return
+
+    opener = COMPRESSION_OPENERS.get(compression, open)
+    with opener(file_path, 'rb') if binary else opener(file_path, 'rt', encoding=encoding, newline='') as file:
+        yield file_path, file
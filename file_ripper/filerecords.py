@@ -0,0 +1,106 @@
+from collections.abc import MutableMapping
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+
+class CompactRecord(MutableMapping):
+    __slots__ = ('_values',)
+    field_names = ()
+    field_indexes = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, field_name):
+        return self._values[self.field_indexes[field_name]]
+
+    def __setitem__(self, field_name, value):
+        self._values[self.field_indexes[field_name]] = value
+
+    def __delitem__(self, field_name):
+        raise TypeError(f'{type(self).__name__} fields cannot be deleted')
+
+    def __iter__(self):
+        return iter(self.field_names)
+
+    def __len__(self):
+        return len(self.field_names)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __reduce__(self):
+        return restore_record, (self.field_names, type(self).__name__, getattr(self, 'encoding', ''), self._values)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.field_names, self._values))
+
+
+class LazyRecord(CompactRecord):
+    __slots__ = ()
+    encoding = 'utf-8'
+
+    def __getitem__(self, field_name):
+        index = self.field_indexes[field_name]
+        value = self._values[index]
+        if isinstance(value, bytes):
+            value = self._values[index] = value.decode(self.encoding)
+        return value
+
+    def to_dict(self) -> dict:
+        return {field_name: self[field_name] for field_name in self.field_names}
+
+
+def create_record_class(field_names, class_name='Record', encoding=''):
+    field_names = tuple(field_names)
+    attributes = {
+        '__slots__': (),
+        'field_names': field_names,
+        'field_indexes': {field_name: index for index, field_name in enumerate(field_names)}
+    }
+    if encoding:
+        attributes['encoding'] = encoding
+    return type(class_name, (LazyRecord if encoding else CompactRecord,), attributes)
+
+
+@lru_cache(maxsize=None)
+def get_record_class(field_names, class_name, encoding):
+    return create_record_class(field_names, class_name, encoding)
+
+
+def restore_record(field_names, class_name, encoding, values):
+    return get_record_class(field_names, class_name, encoding)(values)
+
+
+def encode_json_value(value):
+    if isinstance(value, CompactRecord):
+        return value.to_dict()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def encode_bson_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_sql_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def as_document(record):
+    document = record.to_dict() if isinstance(record, CompactRecord) else record
+    if any(isinstance(value, (Decimal, date)) for value in document.values()):
+        return {field_name: encode_bson_value(value) for field_name, value in document.items()}
+    return document
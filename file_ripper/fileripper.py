@@ -1,17 +1,69 @@
-from typing import IO, List
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import IO, Iterator, List
 
+import fileconstants as fc
 from filedefinition import FileDefinition
 from fileservice import FileService
 
 
+def rip_file_path(file_name: str, file_definition: FileDefinition, file_service_factory):
+    return file_service_factory(file_definition).process_path(file_name)
+
+
 class FileRipper:
     def __init__(self, file_service_factory=None, file_repository=None):
         self.file_service_factory = file_service_factory if file_service_factory is not None \
             else FileService.create_file_service
 
-    def rip_file(self, file: IO, file_definition: FileDefinition):
+    def rip_file(self, file: IO, file_definition: FileDefinition, layout=fc.RECORDS_LAYOUT):
         file_service = self.file_service_factory(file_definition)
-        return file_service.process(file)
+        if layout == fc.COLUMNAR_LAYOUT:
+            return file_service.process_columns(file)
+        elif layout == fc.RECORDS_LAYOUT:
+            return file_service.process(file)
+        else:
+            raise ValueError(f'unsupported layout: {layout}')
+
+    def iter_file(self, file: IO, file_definition: FileDefinition) -> Iterator[dict]:
+        file_service = self.file_service_factory(file_definition)
+        return file_service.iter_records(file)
+
+    def rip_files(self, files: List[IO], file_definition: FileDefinition, workers=0, pool_type=fc.THREAD_POOL):
+        if not workers:
+            return [self.rip_file(f, file_definition) for f in files]
+
+        with self.create_executor(workers, pool_type) as executor:
+            futures = [self.submit_file(executor, f, file_definition, pool_type) for f in files]
+            return [self.get_file_output(future, f) for future, f in zip(futures, files)]
+
+    def iter_rip_files(self, files: List[IO], file_definition: FileDefinition, workers=0,
+                       pool_type=fc.THREAD_POOL) -> Iterator[dict]:
+        if not workers:
+            yield from (self.rip_file(f, file_definition) for f in files)
+            return
+
+        with self.create_executor(workers, pool_type) as executor:
+            futures = {self.submit_file(executor, f, file_definition, pool_type): f for f in files}
+            for future in as_completed(futures):
+                yield self.get_file_output(future, futures[future])
+
+    @staticmethod
+    def create_executor(workers: int, pool_type: str) -> Executor:
+        if pool_type == fc.PROCESS_POOL:
+            return ProcessPoolExecutor(max_workers=workers)
+        elif pool_type == fc.THREAD_POOL:
+            return ThreadPoolExecutor(max_workers=workers)
+        else:
+            raise ValueError(f'unsupported pool_type: {pool_type}')
+
+    def submit_file(self, executor: Executor, file: IO, file_definition: FileDefinition, pool_type: str) -> Future:
+        if pool_type == fc.PROCESS_POOL:
+            return executor.submit(rip_file_path, file.name, file_definition, self.file_service_factory)
+        return executor.submit(self.rip_file, file, file_definition)
 
-    def rip_files(self, files: List[IO], file_definition: FileDefinition):
-        return [self.rip_file(f, file_definition) for f in files]
+    @staticmethod
+    def get_file_output(future: Future, file: IO) -> dict:
+        try:
+            return future.result()
+        except Exception as ex:
+            return {fc.FILE_NAME: getattr(file, 'name', None), fc.ERROR: ex}
@@ -1,16 +1,76 @@
-from typing import IO
-from xml.etree.ElementTree import fromstring, parse
+import csv
+from contextlib import closing
+from itertools import chain
+from operator import itemgetter
+from typing import IO, Iterable, Iterator
+from xml.etree.ElementTree import XMLPullParser, parse
 
 import fileconstants as fc
+import filemetrics
+from filecolumns import create_columns
+from fileconverters import RecordConverter
+from fileopener import get_binary_stream, iter_input_files
+from filerecords import create_record_class
+
+
+XML_READ_SIZE = 64 * 1024
 
 
 class FileService:
     def process(self, file: IO):
-        return {fc.FILE_NAME: file.name, fc.RECORDS: self.process_file_records(file.readlines())}
+        return {fc.FILE_NAME: file.name, fc.RECORDS: self.collect_records(self.iter_records(file))}
+
+    def process_path(self, file_path: str):
+        with closing(self.iter_path_records(file_path)) as records:
+            return {fc.FILE_NAME: file_path, fc.RECORDS: self.collect_records(records)}
+
+    def collect_records(self, records: Iterator[dict]):
+        metrics = filemetrics.metrics
+        with metrics.time('stage_seconds', stage='parse', definition=self.file_definition.file_mask):
+            records = list(records)
+        metrics.increment('records_total', len(records), definition=self.file_definition.file_mask)
+        return records
+
+    def process_columns(self, file: IO):
+        field_names = [field_def.field_name for field_def in self.file_definition.field_definitions]
+        columns = create_columns(field_names, self.iter_raw_records(file))
+        return {fc.FILE_NAME: file.name, fc.COLUMNS: self.get_record_converter().convert_columns(columns)}
+
+    def iter_records(self, file: IO) -> Iterator[dict]:
+        return self.convert_records(self.iter_raw_records(file))
+
+    def iter_raw_records(self, file: IO) -> Iterator[dict]:
+        return self.iter_file_records(get_binary_stream(file) if self.file_definition.encoding else file)
+
+    def get_record_converter(self) -> RecordConverter:
+        if self.record_converter is None:
+            self.record_converter = RecordConverter(self.file_definition.field_definitions)
+        return self.record_converter
+
+    def convert_records(self, records: Iterator[dict]) -> Iterator[dict]:
+        record_converter = self.get_record_converter()
+        return record_converter.convert_records(records) if record_converter.converters else records
+
+    def iter_path_records(self, file_path: str) -> Iterator[dict]:
+        for _, file in iter_input_files(file_path, binary=bool(self.file_definition.encoding)):
+            yield from self.iter_records(file)
 
     def process_file_records(self, lines):
+        return list(self.convert_records(self.iter_file_records(lines)))
+
+    def iter_file_records(self, lines: Iterable[str]) -> Iterator[dict]:
         raise NotImplementedError('Please use a valid implementation of FileService to read files')
 
+    def compile(self):
+        self.get_record_converter()
+        return self
+
+    def create_record_class(self):
+        if not (self.file_definition.compact_records or self.file_definition.encoding):
+            return None
+        return create_record_class((field_def.field_name for field_def in self.file_definition.field_definitions),
+                                   encoding=self.file_definition.encoding)
+
     @staticmethod
     def create_file_service(file_definition):
         if file_definition.file_type == fc.XML:
@@ -23,69 +83,185 @@ class FileService:
             raise ValueError(f'file_definition is configured for unsupported file_type: {file_definition.file_type}')
 
 
+def read_chunks(file: IO, chunk_size: int) -> Iterator:
+    # text and binary handles end with '' and b'' respectively, so stop on any empty chunk
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
 class XmlFileService(FileService):
     def __init__(self, file_definition):
         self.file_definition = file_definition
+        self.record_converter = None
+        self.record_class = self.create_record_class()
 
-    def process_file_records(self, lines):
-        tree = fromstring(''.join(lines))
+    def iter_raw_records(self, file: IO) -> Iterator[dict]:
+        return self.iter_file_records(read_chunks(file, XML_READ_SIZE))
 
-        records = []
-        for item in tree.findall(f'./{self.file_definition.record_element_name}'):
-            record = {}
-            for field_def in self.file_definition.field_definitions:
-                record[field_def.field_name] = item.find(f'{field_def.field_name}').text
-            records.append(record)
+    def iter_file_records(self, lines):
+        record_element_name = self.file_definition.record_element_name
+        parser = XMLPullParser(events=('start', 'end'))
+        root = None
+        depth = 0
+        for line in chain(lines, [None]):
+            if line is None:
+                parser.close()
+            else:
+                parser.feed(line)
+
+            for event, element in parser.read_events():
+                if event == 'start':
+                    root = element if root is None else root
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth == 1:
+                    if element.tag == record_element_name:
+                        yield self.process_record(element)
+                    root.remove(element)
+
+    def process_record(self, item):
+        if self.record_class is not None:
+            return self.record_class([item.find(field_name).text for field_name in self.record_class.field_names])
+
+        record = {}
+        for field_def in self.file_definition.field_definitions:
+            record[field_def.field_name] = item.find(f'{field_def.field_name}').text
+        return record
 
-        return records
+
+class DelimitedRecordDecoder:
+    def __init__(self, file_definition, record_class=None):
+        self.field_names = tuple(field_def.field_name for field_def in file_definition.field_definitions)
+        self.record_class = record_class
+        self.field_count = len(self.field_names)
+        self.encoding = file_definition.encoding
+        self.delimiter = file_definition.delimiter
+        self.quote_character = file_definition.quote_character
+        self.escape_character = file_definition.escape_character
+        self.dialect = {
+            'delimiter': self.delimiter,
+            'quotechar': self.quote_character or None,
+            'escapechar': self.escape_character or None,
+            'quoting': csv.QUOTE_MINIMAL if self.quote_character else csv.QUOTE_NONE
+        }
+
+    def create_reader(self, lines):
+        lines = iter(lines)
+        encoding = self.encoding
+        delimiter = self.delimiter.encode(encoding) if encoding else self.delimiter
+        quote_character = self.quote_character.encode(encoding) if encoding else self.quote_character
+        escape_character = self.escape_character.encode(encoding) if encoding else self.escape_character
+        if len(self.delimiter) != 1 or not (quote_character or escape_character):
+            for line in lines:
+                yield line.split(delimiter)
+            return
+
+        for line in lines:
+            if (quote_character and quote_character in line) or (escape_character and escape_character in line):
+                yield self.read_quoted_fields(line, lines)
+            else:
+                yield line.split(delimiter)
+
+    def read_quoted_fields(self, line, lines):
+        if not self.encoding:
+            return next(csv.reader(chain([line], lines), **self.dialect))
+
+        decoded_lines = (raw_line.decode(self.encoding) for raw_line in chain([line], lines))
+        return [field.encode(self.encoding) for field in next(csv.reader(decoded_lines, **self.dialect))]
+
+    def decode_records(self, lines, skip_header=False):
+        field_names = self.field_names
+        field_count = self.field_count
+        record_class = self.record_class
+        rstrip = bytes.rstrip if self.encoding else str.rstrip
+        reader = self.create_reader(lines)
+        if skip_header:
+            next(reader, None)
+
+        for fields in reader:
+            if field_count != len(fields):
+                raise OSError('File records do not match file definition')
+            if record_class is None:
+                yield dict(zip(field_names, map(rstrip, fields)))
+            else:
+                yield record_class(list(map(rstrip, fields)))
+
+    def decode_line(self, line):
+        return next(self.decode_records([line]))
 
 
 class DelimitedFileService(FileService):
     def __init__(self, file_definition):
         self.file_definition = file_definition
+        self.decoder = None
+        self.record_converter = None
 
-    def process_file_records(self, lines):
-        records = []
-        if self.file_definition.has_header:
-            lines.pop(0)
+    def get_decoder(self):
+        if self.decoder is None:
+            self.decoder = DelimitedRecordDecoder(self.file_definition, self.create_record_class())
+        return self.decoder
 
-        for line in lines:
-            records.append(self.process_line_fields(line))
+    def compile(self):
+        self.get_decoder()
+        return super().compile()
 
-        return records
+    def iter_file_records(self, lines):
+        return self.get_decoder().decode_records(lines, self.file_definition.has_header)
 
     def process_line_fields(self, line):
-        fields = [field.rstrip() for field in line.split(self.file_definition.delimiter)]
-        record = {}
+        return self.get_decoder().decode_line(line)
 
-        field_count = len(self.file_definition.field_definitions)
-        if field_count != len(fields):
-            raise OSError('File records do not match file definition')
 
-        for i in range(0, field_count):
-            record[self.file_definition.field_definitions[i].field_name] = fields[i]
-        return record
+class FixedRecordDecoder:
+    def __init__(self, field_definitions, record_class=None, binary=False):
+        self.field_names = tuple(field_def.field_name for field_def in field_definitions)
+        self.record_class = record_class
+        self.rstrip = bytes.rstrip if binary else str.rstrip
+        self.field_slices = tuple(slice(field_def.start_position, field_def.start_position + field_def.field_length)
+                                  for field_def in field_definitions)
+        self.line_length = max(field_slice.stop for field_slice in self.field_slices)
+        self.get_fields = itemgetter(*self.field_slices) if len(self.field_slices) > 1 \
+            else lambda line: (line[self.field_slices[0]],)
+
+    def decode(self, line):
+        if len(line.rstrip()) < self.line_length:
+            raise IndexError(f'field {self.find_field_past_end(line)} extends past the end of line')
+        if self.record_class is not None:
+            return self.record_class(list(map(self.rstrip, self.get_fields(line))))
+        return dict(zip(self.field_names, map(self.rstrip, self.get_fields(line))))
+
+    def find_field_past_end(self, line):
+        line_length = len(line.rstrip())
+        return next(name for name, field_slice in zip(self.field_names, self.field_slices)
+                    if field_slice.stop > line_length)
 
 
 class FixedFileService(FileService):
     def __init__(self, file_definition):
         self.file_definition = file_definition
+        self.decoder = None
+        self.record_converter = None
 
-    def process_file_records(self, lines):
-        records = []
+    def get_decoder(self):
+        if self.decoder is None:
+            self.decoder = FixedRecordDecoder(self.file_definition.field_definitions, self.create_record_class(),
+                                              bool(self.file_definition.encoding))
+        return self.decoder
+
+    def compile(self):
+        self.get_decoder()
+        return super().compile()
+
+    def iter_file_records(self, lines):
+        lines = iter(lines)
         if self.file_definition.has_header:
-            lines.pop(0)
+            next(lines, None)
 
+        decode = self.get_decoder().decode
         for line in lines:
-            records.append(self.process_line_fields(line))
-
-        return records
+            yield decode(line)
 
     def process_line_fields(self, line):
-        record = {}
-        for field_def in self.file_definition.field_definitions:
-            end_position = field_def.start_position + field_def.field_length
-            if end_position > len(line.rstrip()):
-                raise IndexError(f'field {field_def.field_name} extends past the end of line')
-            record[field_def.field_name] = line[field_def.start_position:end_position].rstrip()
-        return record
+        return self.get_decoder().decode(line)
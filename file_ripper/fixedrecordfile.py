@@ -0,0 +1,101 @@
+import mmap
+from collections.abc import Mapping, Sequence
+
+from filedefinition import FileDefinition
+
+
+class FixedRecordLayout:
+    def __init__(self, file_definition: FileDefinition, encoding: str):
+        self.field_names = tuple(field_def.field_name for field_def in file_definition.field_definitions)
+        self.field_positions = {field_def.field_name: (field_def.start_position,
+                                                       field_def.start_position + field_def.field_length)
+                                for field_def in file_definition.field_definitions}
+        self.record_length = max(end for _, end in self.field_positions.values())
+        self.encoding = encoding
+
+
+class FixedRecord(Mapping):
+    __slots__ = ('buffer', 'offset', 'layout')
+
+    def __init__(self, buffer, offset: int, layout: FixedRecordLayout):
+        self.buffer = buffer
+        self.offset = offset
+        self.layout = layout
+
+    def __getitem__(self, field_name):
+        start, end = self.layout.field_positions[field_name]
+        return self.buffer[self.offset + start:self.offset + end].decode(self.layout.encoding).rstrip()
+
+    def __iter__(self):
+        return iter(self.layout.field_names)
+
+    def __len__(self):
+        return len(self.layout.field_names)
+
+    def __repr__(self):
+        return f'FixedRecord({dict(self)})'
+
+
+class FixedRecordFile(Sequence):
+    def __init__(self, file_path: str, file_definition: FileDefinition, encoding: str = 'utf-8'):
+        self.layout = FixedRecordLayout(file_definition, encoding)
+        self.file = open(file_path, 'rb')
+        self.buffer = b''
+        try:
+            size = self.file.seek(0, 2)
+            if size:
+                self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self.data_offset = self.buffer.find(b'\n') + 1 if file_definition.has_header else 0
+            if file_definition.has_header and not self.data_offset:
+                self.data_offset = size
+            self.record_stride, self.terminator_length = self.find_record_stride()
+            if self.record_stride - self.terminator_length < self.layout.record_length:
+                raise IndexError(f'records are {self.record_stride - self.terminator_length} bytes long but the '
+                                 f'file definition needs {self.layout.record_length}')
+
+            data_size = size - self.data_offset
+            record_count = (data_size + self.terminator_length) // self.record_stride if data_size else 0
+            self.indices = range(record_count)
+        except BaseException:
+            self.close()
+            raise
+
+    def find_record_stride(self):
+        line_end = self.buffer.find(b'\n', self.data_offset)
+        if line_end < 0:
+            return self.layout.record_length, 0
+        terminator_length = 2 if line_end > self.data_offset and self.buffer[line_end - 1:line_end] == b'\r' else 1
+        return line_end + 1 - self.data_offset, terminator_length
+
+    def view(self, indices: range):
+        record_file = object.__new__(FixedRecordFile)
+        record_file.__dict__.update(self.__dict__)
+        record_file.indices = indices
+        return record_file
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.view(self.indices[index])
+
+        record_number = self.indices[index]
+        offset = self.data_offset + record_number * self.record_stride
+        record_end = offset + self.record_stride - self.terminator_length
+        if self.terminator_length and record_end < len(self.buffer) \
+                and self.buffer[record_end + self.terminator_length - 1] != ord('\n'):
+            raise ValueError(f'record {record_number} is not {self.record_stride} bytes long')
+        return FixedRecord(self.buffer, offset, self.layout)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
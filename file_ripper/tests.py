@@ -1,11 +1,29 @@
+import bz2
+import gzip
+from datetime import date
+from decimal import Decimal
+import io
+import json
 import os
+import tempfile
+import zipfile
 import unittest
-from unittest.mock import Mock
+import urllib.request
+from unittest.mock import Mock, patch
+from xml.etree.ElementTree import ParseError
 
 import fileconstants as fc
 from filedefinition import FileDefinition, create_file_definitions, FieldDefinition
+import filecolumns
+import filemetrics
+from fileopener import detect_compression
+import fileconverters
+from fileconverters import FieldConversionError
+from filerecords import CompactRecord, LazyRecord, create_record_class, encode_json_value
+from filecolumns import create_columns, StringColumn
 from fileripper import FileRipper
-from fileservice import XmlFileService, DelimitedFileService, FixedFileService, FileService
+from fixedrecordfile import FixedRecordFile
+from fileservice import XmlFileService, DelimitedFileService, FixedFileService, FileService, FixedRecordDecoder
 
 
 class FileDefinitionTests(unittest.TestCase):
@@ -52,6 +70,20 @@ class FileDefinitionTests(unittest.TestCase):
         file_definitions = create_file_definitions(self.json_data)
         self.assert_file_definition(file_definitions[0])
 
+    def test_create_file_definitions_quoting_defaults(self):
+        file_definition = create_file_definitions(self.json_data)[0]
+        self.assertEqual('', file_definition.quote_character)
+        self.assertEqual('', file_definition.escape_character)
+
+    def test_create_file_definitions_max_concurrency(self):
+        self.assertEqual(1, create_file_definitions(self.json_data)[0].max_concurrency)
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.MAX_CONCURRENCY] = 3
+        self.assertEqual(3, create_file_definitions(self.json_data)[0].max_concurrency)
+
+    def test_create_file_definitions_invalid_max_concurrency(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.MAX_CONCURRENCY] = 0
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
     def test_create_file_definitions_invalid_json(self):
         self.json_data = {}
         self.assertRaises(KeyError, create_file_definitions, self.json_data)
@@ -131,6 +163,44 @@ class ExportDefinitionTests(FileDefinitionTests):
         del (self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.OUTPUT_FILE_PATH])
         self.assertRaises(ValueError, create_file_definitions, self.json_data)
 
+    def test_export_definition_batch_settings(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = 500
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.MAX_BATCH_BYTES] = 1048576
+        export_definition = create_file_definitions(self.json_data)[0].export_definition
+        self.assertEqual(500, export_definition.batch_size)
+        self.assertEqual(1048576, export_definition.max_batch_bytes)
+
+    def test_export_definition_batch_settings_default_to_unbatched(self):
+        export_definition = create_file_definitions(self.json_data)[0].export_definition
+        self.assertEqual(0, export_definition.batch_size)
+        self.assertEqual(0, export_definition.max_batch_bytes)
+
+    def test_invalid_export_definition_stream_records_for_database_export(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.EXPORT_TYPE] = fc.DATABASE_EXPORT
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.STREAM_RECORDS] = True
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
+    def test_export_definition_output_defaults(self):
+        export_definition = create_file_definitions(self.json_data)[0].export_definition
+        self.assertEqual(fc.NDJSON, export_definition.output_format)
+        self.assertEqual('', export_definition.output_compression)
+
+    def test_invalid_export_definition_unsupported_output_format(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.OUTPUT_FORMAT] = 'PARQUET'
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
+    def test_invalid_export_definition_unsupported_output_compression(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.OUTPUT_COMPRESSION] = 'bz2'
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
+    def test_invalid_export_definition_unsupported_http_compression(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.HTTP_COMPRESSION] = 'brotli'
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
+    def test_invalid_export_definition_negative_batch_size(self):
+        self.json_data[fc.FILE_DEFINITIONS][0][fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = -1
+        self.assertRaises(ValueError, create_file_definitions, self.json_data)
+
 
 class FileConstantsTests(unittest.TestCase):
     def test_file_type(self):
@@ -229,6 +299,91 @@ class FileConstantsTests(unittest.TestCase):
     def test_database_name(self):
         self.assertEqual(fc.DATABASE_NAME, 'database_name')
 
+    def test_write_concern(self):
+        self.assertEqual(fc.WRITE_CONCERN, 'write_concern')
+
+    def test_http_pool_size(self):
+        self.assertEqual(fc.HTTP_POOL_SIZE, 'http_pool_size')
+
+    def test_http_compression(self):
+        self.assertEqual(fc.HTTP_COMPRESSION, 'http_compression')
+
+    def test_stream_records(self):
+        self.assertEqual(fc.STREAM_RECORDS, 'stream_records')
+
+    def test_gzip(self):
+        self.assertEqual(fc.GZIP, 'gzip')
+
+    def test_max_in_flight(self):
+        self.assertEqual(fc.MAX_IN_FLIGHT, 'max_in_flight')
+
+    def test_max_concurrency(self):
+        self.assertEqual(fc.MAX_CONCURRENCY, 'max_concurrency')
+
+    def test_output_format(self):
+        self.assertEqual(fc.OUTPUT_FORMAT, 'output_format')
+
+    def test_compact_records(self):
+        self.assertEqual(fc.COMPACT_RECORDS, 'compact_records')
+
+    def test_encoding(self):
+        self.assertEqual(fc.ENCODING, 'encoding')
+
+    def test_output_compression(self):
+        self.assertEqual(fc.OUTPUT_COMPRESSION, 'output_compression')
+
+    def test_ndjson(self):
+        self.assertEqual(fc.NDJSON, 'NDJSON')
+
+    def test_csv(self):
+        self.assertEqual(fc.CSV, 'CSV')
+
+    def test_table_name(self):
+        self.assertEqual(fc.TABLE_NAME, 'table_name')
+
+    def test_transaction_size(self):
+        self.assertEqual(fc.TRANSACTION_SIZE, 'transaction_size')
+
+    def test_data_type(self):
+        self.assertEqual(fc.DATA_TYPE, 'data_type')
+
+    def test_format(self):
+        self.assertEqual(fc.FORMAT, 'format')
+
+    def test_data_types(self):
+        self.assertEqual(['STRING', 'INTEGER', 'FLOAT', 'DECIMAL', 'BOOLEAN', 'DATE', 'DATETIME'],
+                         [fc.STRING, fc.INTEGER, fc.FLOAT, fc.DECIMAL, fc.BOOLEAN, fc.DATE, fc.DATETIME])
+
+    def test_columns(self):
+        self.assertEqual(fc.COLUMNS, 'columns')
+
+    def test_records_layout(self):
+        self.assertEqual(fc.RECORDS_LAYOUT, 'records')
+
+    def test_columnar_layout(self):
+        self.assertEqual(fc.COLUMNAR_LAYOUT, 'columnar')
+
+    def test_quote_character(self):
+        self.assertEqual(fc.QUOTE_CHARACTER, 'quote_character')
+
+    def test_escape_character(self):
+        self.assertEqual(fc.ESCAPE_CHARACTER, 'escape_character')
+
+    def test_batch_size(self):
+        self.assertEqual(fc.BATCH_SIZE, 'batch_size')
+
+    def test_max_batch_bytes(self):
+        self.assertEqual(fc.MAX_BATCH_BYTES, 'max_batch_bytes')
+
+    def test_error(self):
+        self.assertEqual(fc.ERROR, 'error')
+
+    def test_thread_pool(self):
+        self.assertEqual(fc.THREAD_POOL, 'THREAD')
+
+    def test_process_pool(self):
+        self.assertEqual(fc.PROCESS_POOL, 'PROCESS')
+
 
 class CreateFileServiceTests(unittest.TestCase):
     """Test cases for file service factory function code"""
@@ -365,11 +520,113 @@ class DelimitedFileServiceTests(FileServiceTests):
             file_output = self.file_service.process(file)
             self.assert_valid_file_output(file_output, self.file_name)
 
+    def test_process_path_given_compressed_files(self):
+        with open(self.file_name, 'rb') as file:
+            content = file.read()
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name, opener, compression in [('people.txt.gz', gzip.open, 'gzip'),
+                                                   ('people.txt.bz2', bz2.open, 'bz2'),
+                                                   ('people.dat', gzip.open, 'gzip')]:
+                file_path = os.path.join(directory, file_name)
+                with opener(file_path, 'wb') as file:
+                    file.write(content)
+                self.assertEqual(compression, detect_compression(file_path))
+                self.assert_valid_file_output(self.file_service.process_path(file_path), file_path)
+
+    def test_process_path_given_zip_archive_with_multiple_members(self):
+        with open(self.file_name, 'r') as file:
+            lines = file.readlines()
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'people.zip')
+            with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('part-1.txt', ''.join(lines[:3]))
+                archive.writestr('nested/', '')
+                archive.writestr('nested/part-2.txt', lines[0] + ''.join(lines[3:]))
+            self.assertEqual('zip', detect_compression(file_path))
+            self.assert_valid_file_output(self.file_service.process_path(file_path), file_path)
+
+    def test_process_path_given_plain_file(self):
+        self.assertEqual('', detect_compression(self.file_name))
+        self.assert_valid_file_output(self.file_service.process_path(self.file_name), self.file_name)
+
+    def test_process_path_given_encoding_reads_compressed_files_in_binary_mode(self):
+        self.file_definition.encoding = 'latin-1'
+        self.file_service = DelimitedFileService(self.file_definition)
+        with open(self.file_name, 'rb') as file:
+            content = file.read()
+        with tempfile.TemporaryDirectory() as directory:
+            gzip_path = os.path.join(directory, 'people.txt.gz')
+            with gzip.open(gzip_path, 'wb') as file:
+                file.write(content)
+            zip_path = os.path.join(directory, 'people.zip')
+            with zipfile.ZipFile(zip_path, 'w') as archive:
+                archive.writestr('people.txt', content)
+            for file_path in [self.file_name, gzip_path, zip_path]:
+                file_output = self.file_service.process_path(file_path)
+                self.assertIsInstance(file_output[fc.RECORDS][0], LazyRecord)
+                self.assert_valid_file_output(file_output, file_path)
+
     def test_process_given_invalid_file(self):
         with open(self.file_name, 'r') as file:
             self.file_definition.field_definitions.remove(self.file_definition.field_definitions[-1])
             self.assertRaises(OSError, self.file_service.process, file)
 
+    def test_iter_records_streams_records(self):
+        with open(self.file_name, 'r') as file:
+            records = self.file_service.iter_records(file)
+            self.assertFalse(isinstance(records, list))
+            self.assertEqual('Aaron', next(records)['name'])
+            self.assertEqual(['Gene', 'Xander', 'Mason'], [record['name'] for record in records])
+
+    def test_iter_records_given_invalid_file(self):
+        with open(self.file_name, 'r') as file:
+            self.file_definition.field_definitions.remove(self.file_definition.field_definitions[-1])
+            records = self.file_service.iter_records(file)
+            self.assertRaises(OSError, next, records)
+
+    def test_process_without_quote_character_keeps_quotes_literal(self):
+        with open(self.file_name, 'w') as f:
+            f.write('Name|Age|DOB\n')
+            f.write('"12 inch|39|09/04/1980\n')
+            f.write('Gene|61|01/15/1958\n')
+        records = self.file_service.process_path(self.file_name)[fc.RECORDS]
+        self.assertEqual(['"12 inch', 'Gene'], [record['name'] for record in records])
+
+    def test_process_given_quoted_fields(self):
+        self.file_definition.quote_character = '"'
+        with open(self.file_name, 'w') as f:
+            f.write('Name|Age|DOB\n')
+            f.write('"Smith|Aaron"|39|09/04/1980\n')
+            f.write('"Gene\nJr"|61|01/15/1958\n')
+        with open(self.file_name, 'r', newline='') as file:
+            records = self.file_service.process(file)[fc.RECORDS]
+        self.assertEqual('Smith|Aaron', records[0]['name'])
+        self.assertEqual('Gene\nJr', records[1]['name'])
+        self.assertEqual('01/15/1958', records[1]['dob'])
+
+    def test_process_given_escape_character(self):
+        self.file_definition.quote_character = ''
+        self.file_definition.escape_character = '\\'
+        with open(self.file_name, 'w') as f:
+            f.write('Name|Age|DOB\n')
+            f.write('Smith\\|Aaron|39|09/04/1980\n')
+        with open(self.file_name, 'r') as file:
+            records = self.file_service.process(file)[fc.RECORDS]
+        self.assertEqual([{'name': 'Smith|Aaron', 'age': '39', 'dob': '09/04/1980'}], records)
+
+    def test_process_given_multi_character_delimiter(self):
+        self.file_definition.delimiter = '||'
+        with open(self.file_name, 'w') as f:
+            f.write('Name||Age||DOB\n')
+            f.write('Aaron||39||09/04/1980\n')
+        with open(self.file_name, 'r') as file:
+            records = self.file_service.process(file)[fc.RECORDS]
+        self.assertEqual([{'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'}], records)
+
+    def test_process_line_fields(self):
+        self.assertEqual({'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'},
+                         self.file_service.process_line_fields('Aaron|39 |09/04/1980\n'))
+
 
 class FixedFileServiceTests(FileServiceTests):
     def setUp(self):
@@ -396,6 +653,441 @@ class FixedFileServiceTests(FileServiceTests):
                 FieldDefinition({fc.FIELD_NAME: 'address', fc.START_POSITION: 32, fc.FIELD_LENGTH: 2}, fc.FIXED))
             self.assertRaises(IndexError, self.file_service.process, file)
 
+    def test_iter_records(self):
+        with open(self.file_name, 'r') as file:
+            file_output = {fc.FILE_NAME: file.name, fc.RECORDS: list(self.file_service.iter_records(file))}
+            self.assert_valid_file_output(file_output, self.file_name)
+
+    def test_process_columns(self):
+        with open(self.file_name, 'r') as file:
+            file_output = self.file_service.process_columns(file)
+        self.assertEqual(self.file_name, file_output[fc.FILE_NAME])
+        self.assertEqual(['name', 'age', 'dob'], list(file_output[fc.COLUMNS]))
+        self.assertEqual(['Aaron', 'Gene', 'Xander', 'Mason'], list(file_output[fc.COLUMNS]['name']))
+        self.assertEqual(['39', '61', '4', '12'], list(file_output[fc.COLUMNS]['age']))
+
+
+class FixedRecordFileTests(FileServiceTests):
+    def setUp(self):
+        super(FixedRecordFileTests, self).setUp()
+        self.file_data[fc.FILE_TYPE] = fc.FIXED
+        self.file_definition = FileDefinition(self.file_data)
+        self.file_name = 'Valid-fixed-mmap-09032019.txt'
+        self.write_lines('\n')
+
+    def write_lines(self, terminator, final_terminator=True):
+        lines = ['Name         Age      DOB       ', 'Aaron        39       09/04/1980',
+                 'Gene         61       01/15/1958', 'Xander       4        11/22/2014',
+                 'Mason        12       04/13/2007']
+        with open(self.file_name, 'w', newline='') as f:
+            f.write(terminator.join(lines) + (terminator if final_terminator else ''))
+
+    def test_len_and_indexing(self):
+        with FixedRecordFile(self.file_name, self.file_definition) as records:
+            self.assertEqual(4, len(records))
+            self.assertEqual({'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'}, dict(records[0]))
+            self.assertEqual('Mason', records[-1]['name'])
+            self.assertRaises(IndexError, records.__getitem__, 4)
+
+    def test_slicing(self):
+        with FixedRecordFile(self.file_name, self.file_definition) as records:
+            page = records[1:3]
+            self.assertEqual(2, len(page))
+            self.assertEqual(['Gene', 'Xander'], [record['name'] for record in page])
+            self.assertEqual(['Aaron', 'Xander'], [record['name'] for record in records[::2]])
+            self.assertEqual('Xander', page[1:][0]['name'])
+
+    def test_crlf_file_without_final_terminator(self):
+        self.write_lines('\r\n', final_terminator=False)
+        with FixedRecordFile(self.file_name, self.file_definition) as records:
+            self.assertEqual(4, len(records))
+            self.assertEqual('04/13/2007', records[3]['dob'])
+
+    def test_records_too_short(self):
+        self.file_definition.field_definitions.append(
+            FieldDefinition({fc.FIELD_NAME: 'address', fc.START_POSITION: 32, fc.FIELD_LENGTH: 2}, fc.FIXED))
+        self.assertRaises(IndexError, FixedRecordFile, self.file_name, self.file_definition)
+
+    def test_records_too_short_closes_file(self):
+        self.file_definition.field_definitions.append(
+            FieldDefinition({fc.FIELD_NAME: 'address', fc.START_POSITION: 32, fc.FIELD_LENGTH: 2}, fc.FIXED))
+        opened = []
+
+        def open_file(*args):
+            opened.append(open(*args))
+            return opened[-1]
+
+        with patch('fixedrecordfile.open', create=True, side_effect=open_file):
+            self.assertRaises(IndexError, FixedRecordFile, self.file_name, self.file_definition)
+        self.assertTrue(opened[0].closed)
+
+    def test_record_with_unexpected_length(self):
+        with open(self.file_name, 'a') as f:
+            f.write('Jim          45       08/15/1974   \n')
+            f.write('Tom          45       08/15/1974\n')
+        with FixedRecordFile(self.file_name, self.file_definition) as records:
+            self.assertRaises(ValueError, records.__getitem__, 4)
+
+
+class FixedRecordDecoderTests(unittest.TestCase):
+    def setUp(self):
+        self.field_definitions = [
+            FieldDefinition({fc.FIELD_NAME: 'name', fc.START_POSITION: 0, fc.FIELD_LENGTH: 6}, fc.FIXED),
+            FieldDefinition({fc.FIELD_NAME: 'age', fc.START_POSITION: 6, fc.FIELD_LENGTH: 3}, fc.FIXED),
+            FieldDefinition({fc.FIELD_NAME: 'dob', fc.START_POSITION: 9, fc.FIELD_LENGTH: 10}, fc.FIXED)
+        ]
+
+    def test_decode(self):
+        decoder = FixedRecordDecoder(self.field_definitions)
+        record = decoder.decode('Aaron 39 09/04/1980\n')
+        self.assertEqual({'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'}, record)
+
+    def test_decode_single_field(self):
+        decoder = FixedRecordDecoder(self.field_definitions[:1])
+        self.assertEqual({'name': 'Aaron'}, decoder.decode('Aaron 39\n'))
+
+    def test_decode_line_too_short(self):
+        decoder = FixedRecordDecoder(self.field_definitions)
+        with self.assertRaisesRegex(IndexError, 'field age extends past the end of line'):
+            decoder.decode('Aaron 3\n')
+
+
+class FileMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.registry = filemetrics.MetricsRegistry(buckets=(0.5, 1.0), clock=lambda: self.now)
+        self.addCleanup(filemetrics.disable_metrics)
+
+    def test_metrics_disabled_by_default(self):
+        self.assertFalse(filemetrics.metrics.enabled)
+        with filemetrics.metrics.time('stage_seconds', stage='parse'):
+            filemetrics.metrics.increment('records_total', 5)
+
+    def test_time_observes_histogram(self):
+        with self.registry.time('stage_seconds', stage='parse', definition='*.csv'):
+            self.now += 0.75
+        histogram = self.registry.to_dict()['histograms'][0]
+        self.assertEqual({'stage': 'parse', 'definition': '*.csv'}, histogram['labels'])
+        self.assertEqual(1, histogram['count'])
+        self.assertEqual({'0.5': 0, '1.0': 1}, histogram['buckets'])
+
+    def test_to_prometheus_text(self):
+        self.registry.increment('records_total', 3, definition='*.csv')
+        self.registry.increment('records_total', 2, definition='*.csv')
+        self.registry.observe('stage_seconds', 0.25, stage='move')
+        self.assertEqual('file_ripper_records_total{definition="*.csv"} 5\n'
+                         'file_ripper_stage_seconds_bucket{stage="move",le="0.5"} 1\n'
+                         'file_ripper_stage_seconds_bucket{stage="move",le="1.0"} 1\n'
+                         'file_ripper_stage_seconds_bucket{stage="move",le="+Inf"} 1\n'
+                         'file_ripper_stage_seconds_count{stage="move"} 1\n'
+                         'file_ripper_stage_seconds_sum{stage="move"} 0.25\n', self.registry.to_prometheus_text())
+
+    def test_prometheus_sink(self):
+        self.registry.increment('files_total')
+        sink = filemetrics.PrometheusSink(self.registry, 0, '127.0.0.1').start()
+        self.addCleanup(sink.close)
+        with urllib.request.urlopen(f'http://127.0.0.1:{sink.port}/metrics') as response:
+            self.assertEqual('file_ripper_files_total 1\n', response.read().decode('utf-8'))
+
+    def test_json_file_sink_dumps_on_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'metrics.json')
+            self.registry.increment('files_total')
+            filemetrics.JsonFileSink(self.registry, file_path, interval=60).start().close()
+            with open(file_path) as file:
+                self.assertEqual(1, json.load(file)['counters'][0]['value'])
+
+    def test_file_service_process_records_metrics(self):
+        filemetrics.enable_metrics(self.registry)
+        file_definition = FileDefinition({fc.FILE_MASK: '*.csv', fc.FILE_TYPE: fc.DELIMITED, fc.DELIMITER: ',',
+                                           fc.FIELD_DEFINITIONS: [{fc.FIELD_NAME: 'name'}],
+                                           fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'url'}})
+        with tempfile.TemporaryFile('w+') as file:
+            file.write('Jason\nJane')
+            file.seek(0)
+            FileService.create_file_service(file_definition).process(file)
+        self.assertEqual([{'name': 'records_total', 'labels': {'definition': '*.csv'}, 'value': 2}],
+                         self.registry.to_dict()['counters'])
+
+
+class FileConvertersTests(unittest.TestCase):
+    def setUp(self):
+        self.file_data = {
+            fc.FILE_MASK: '*.txt',
+            fc.FILE_TYPE: fc.DELIMITED,
+            fc.DELIMITER: '|',
+            fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'url'},
+            fc.FIELD_DEFINITIONS: [
+                {fc.FIELD_NAME: 'name'},
+                {fc.FIELD_NAME: 'age', fc.DATA_TYPE: fc.INTEGER},
+                {fc.FIELD_NAME: 'balance', fc.DATA_TYPE: fc.DECIMAL},
+                {fc.FIELD_NAME: 'dob', fc.DATA_TYPE: fc.DATE, fc.FORMAT: '%m/%d/%Y'},
+                {fc.FIELD_NAME: 'active', fc.DATA_TYPE: fc.BOOLEAN}
+            ]
+        }
+        self.lines = ['Aaron|39|10.50|09/04/1980|Y\n', 'Gene||0.25|01/15/1958|false\n']
+
+    def create_file_service(self):
+        return FileService.create_file_service(FileDefinition(self.file_data))
+
+    def test_field_definition_data_type_defaults_to_string(self):
+        field_definition = FileDefinition(self.file_data).field_definitions[0]
+        self.assertEqual(fc.STRING, field_definition.data_type)
+        self.assertEqual('', field_definition.format)
+
+    def test_field_definition_given_unsupported_data_type(self):
+        self.file_data[fc.FIELD_DEFINITIONS][0][fc.DATA_TYPE] = 'MONEY'
+        self.assertRaises(ValueError, FileDefinition, self.file_data)
+
+    def test_process_file_records_converts_fields(self):
+        records = self.create_file_service().process_file_records(self.lines)
+        self.assertEqual({'name': 'Aaron', 'age': 39, 'balance': Decimal('10.50'), 'dob': date(1980, 9, 4),
+                          'active': True}, records[0])
+        self.assertEqual({'name': 'Gene', 'age': None, 'balance': Decimal('0.25'), 'dob': date(1958, 1, 15),
+                          'active': False}, records[1])
+
+    def test_iter_records_reports_field_record_and_position(self):
+        self.lines.append('Xander|four|1|11/22/2014|yes\n')
+        with self.assertRaises(FieldConversionError) as context:
+            list(self.create_file_service().iter_records(self.lines))
+        self.assertEqual(('age', 'four', 3, 1), (context.exception.field_name, context.exception.value,
+                                                context.exception.record_number, context.exception.position))
+        self.assertIn('field age', str(context.exception))
+
+    def test_iter_records_given_fixed_file_reports_start_position(self):
+        self.file_data[fc.FILE_TYPE] = fc.FIXED
+        self.file_data[fc.FIELD_DEFINITIONS] = [
+            {fc.FIELD_NAME: 'name', fc.START_POSITION: 0, fc.FIELD_LENGTH: 6},
+            {fc.FIELD_NAME: 'age', fc.START_POSITION: 6, fc.FIELD_LENGTH: 3, fc.DATA_TYPE: fc.INTEGER}
+        ]
+        file_service = self.create_file_service()
+        self.assertEqual([{'name': 'Aaron', 'age': 39}], file_service.process_file_records(['Aaron  39\n']))
+        with self.assertRaises(FieldConversionError) as context:
+            file_service.process_file_records(['Aaron  39\n', 'Gene   xx\n'])
+        self.assertEqual((2, 6), (context.exception.record_number, context.exception.position))
+
+    def test_process_columns_converts_columns(self):
+        with tempfile.TemporaryFile('w+') as file:
+            file.writelines(self.lines)
+            file.seek(0)
+            columns = self.create_file_service().process_columns(file)[fc.COLUMNS]
+        self.assertEqual(['Aaron', 'Gene'], list(columns['name']))
+        self.assertEqual([39, None], list(columns['age']))
+        self.assertEqual([date(1980, 9, 4), date(1958, 1, 15)], list(columns['dob']))
+
+    def test_process_columns_given_xml_file_with_empty_element(self):
+        self.file_data[fc.FILE_TYPE] = fc.XML
+        self.file_data[fc.RECORD_ELEMENT_NAME] = 'person'
+        self.file_data[fc.FIELD_DEFINITIONS] = [{fc.FIELD_NAME: 'name'},
+                                                {fc.FIELD_NAME: 'age', fc.DATA_TYPE: fc.INTEGER}]
+        with tempfile.TemporaryFile('w+') as file:
+            file.write('<people><person><name>Aaron</name><age>39</age></person>'
+                       '<person><name>Gene</name><age></age></person></people>')
+            file.seek(0)
+            columns = self.create_file_service().process_columns(file)[fc.COLUMNS]
+        self.assertEqual([39, None], list(columns['age']))
+
+    def test_process_columns_given_integers_larger_than_int64(self):
+        with tempfile.TemporaryFile('w+') as file:
+            file.writelines(line.replace('|39|', f'|{2 ** 70}|') for line in self.lines[:1] * 2)
+            file.seek(0)
+            columns = self.create_file_service().process_columns(file)[fc.COLUMNS]
+        self.assertEqual([2 ** 70, 2 ** 70], list(columns['age']))
+
+    @unittest.skipIf(fileconverters.numpy is None, 'numpy is not installed')
+    def test_process_columns_converts_numeric_columns_with_numpy(self):
+        with tempfile.TemporaryFile('w+') as file:
+            file.writelines(self.lines[:1] * 3)
+            file.seek(0)
+            columns = self.create_file_service().process_columns(file)[fc.COLUMNS]
+        self.assertEqual('int64', str(columns['age'].dtype))
+        self.assertEqual([39, 39, 39], list(columns['age']))
+
+    @patch('filecolumns.numpy', None)
+    @patch('fileconverters.numpy', None)
+    def test_process_columns_converts_numeric_columns_without_numpy(self):
+        with tempfile.TemporaryFile('w+') as file:
+            file.writelines(self.lines[:1] * 3)
+            file.seek(0)
+            columns = self.create_file_service().process_columns(file)[fc.COLUMNS]
+        self.assertEqual('q', columns['age'].typecode)
+
+
+class FileRecordsTests(unittest.TestCase):
+    def setUp(self):
+        self.record_class = create_record_class(['name', 'age'])
+        self.file_data = {
+            fc.FILE_MASK: '*.txt',
+            fc.FILE_TYPE: fc.DELIMITED,
+            fc.DELIMITER: '|',
+            fc.COMPACT_RECORDS: True,
+            fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'url'},
+            fc.FIELD_DEFINITIONS: [{fc.FIELD_NAME: 'name'}, {fc.FIELD_NAME: 'age', fc.DATA_TYPE: fc.INTEGER}]
+        }
+
+    def test_record_supports_mapping_access(self):
+        record = self.record_class(['Aaron', '39'])
+        record['age'] = 39
+        self.assertEqual('Aaron', record['name'])
+        self.assertEqual({'name': 'Aaron', 'age': 39}, record)
+        self.assertEqual(['name', 'age'], list(record))
+        self.assertEqual(['Aaron', 39], list(record.values()))
+        self.assertEqual([('name', 'Aaron'), ('age', 39)], list(record.items()))
+        self.assertEqual(2, len(record))
+        self.assertIsNone(record.get('address'))
+        self.assertRaises(KeyError, record.__setitem__, 'address', '')
+        self.assertRaises(TypeError, record.__delitem__, 'name')
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_encode_json_value(self):
+        self.assertEqual('{"name": "Aaron", "age": "39"}',
+                         json.dumps(self.record_class(['Aaron', '39']), default=encode_json_value))
+        self.assertRaises(TypeError, json.dumps, object(), default=encode_json_value)
+
+    def test_file_definition_compact_records_defaults_to_false(self):
+        del self.file_data[fc.COMPACT_RECORDS]
+        self.assertFalse(FileDefinition(self.file_data).compact_records)
+
+    def test_process_file_records_given_delimited_file(self):
+        file_service = FileService.create_file_service(FileDefinition(self.file_data))
+        records = file_service.process_file_records(['Aaron|39\n', 'Gene|61\n'])
+        self.assertIsInstance(records[0], CompactRecord)
+        self.assertEqual([{'name': 'Aaron', 'age': 39}, {'name': 'Gene', 'age': 61}], records)
+
+    def test_process_file_records_given_fixed_file(self):
+        self.file_data[fc.FILE_TYPE] = fc.FIXED
+        self.file_data[fc.FIELD_DEFINITIONS] = [{fc.FIELD_NAME: 'name', fc.START_POSITION: 0, fc.FIELD_LENGTH: 6},
+                                                {fc.FIELD_NAME: 'age', fc.START_POSITION: 6, fc.FIELD_LENGTH: 2}]
+        records = FileService.create_file_service(FileDefinition(self.file_data)).process_file_records(['Aaron 39\n'])
+        self.assertIsInstance(records[0], CompactRecord)
+        self.assertEqual([{'name': 'Aaron', 'age': '39'}], records)
+
+    def test_process_file_records_given_xml_file(self):
+        self.file_data[fc.FILE_TYPE] = fc.XML
+        self.file_data[fc.RECORD_ELEMENT_NAME] = 'person'
+        file_service = FileService.create_file_service(FileDefinition(self.file_data))
+        records = file_service.process_file_records(['<people><person><name>Aaron</name><age>39</age></person>',
+                                                     '</people>'])
+        self.assertIsInstance(records[0], CompactRecord)
+        self.assertEqual([{'name': 'Aaron', 'age': 39}], records)
+
+
+class BinaryFileServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.file_data = {
+            fc.FILE_MASK: '*.txt',
+            fc.FILE_TYPE: fc.FIXED,
+            fc.ENCODING: 'latin-1',
+            fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'url'},
+            fc.FIELD_DEFINITIONS: [{fc.FIELD_NAME: 'name', fc.START_POSITION: 0, fc.FIELD_LENGTH: 8},
+                                   {fc.FIELD_NAME: 'city', fc.START_POSITION: 8, fc.FIELD_LENGTH: 8},
+                                   {fc.FIELD_NAME: 'age', fc.START_POSITION: 16, fc.FIELD_LENGTH: 3,
+                                    fc.DATA_TYPE: fc.INTEGER}]
+        }
+
+    def create_file_service(self):
+        return FileService.create_file_service(FileDefinition(self.file_data))
+
+    def test_file_definition_encoding_defaults_to_text_mode(self):
+        del self.file_data[fc.ENCODING]
+        self.assertEqual('', FileDefinition(self.file_data).encoding)
+
+    def test_file_definition_given_invalid_encoding(self):
+        for encoding in ['not-an-encoding', 'utf-16']:
+            self.file_data[fc.ENCODING] = encoding
+            self.assertRaises(ValueError, FileDefinition, self.file_data)
+
+    def test_file_definition_given_multi_byte_encoding_for_fixed_file(self):
+        for encoding in ['utf-8', 'shift_jis']:
+            self.file_data[fc.ENCODING] = encoding
+            self.assertRaisesRegex(ValueError, 'single-byte', FileDefinition, self.file_data)
+        self.file_data[fc.FILE_TYPE] = fc.DELIMITED
+        self.file_data[fc.DELIMITER] = ','
+        self.assertEqual('shift_jis', FileDefinition(self.file_data).encoding)
+
+    def test_file_definition_given_single_byte_encoding_for_fixed_file(self):
+        for encoding in ['ascii', 'latin-1', 'cp1252', 'iso8859-15']:
+            self.file_data[fc.ENCODING] = encoding
+            self.assertEqual(encoding, FileDefinition(self.file_data).encoding)
+
+    def test_file_definition_given_encoding_for_xml_file(self):
+        self.file_data[fc.FILE_TYPE] = fc.XML
+        self.file_data[fc.RECORD_ELEMENT_NAME] = 'person'
+        self.assertRaises(ValueError, FileDefinition, self.file_data)
+
+    def test_process_file_records_decodes_fields_lazily(self):
+        records = self.create_file_service().process_file_records(['José    Málaga   39\r\n'.encode('latin-1')])
+        self.assertEqual(b'M\xe1laga', records[0]._values[1])
+        self.assertEqual('Málaga', records[0]['city'])
+        self.assertEqual('Málaga', records[0]._values[1])
+        self.assertEqual({'name': 'José', 'city': 'Málaga', 'age': 39}, records[0].to_dict())
+
+    def test_rip_file_given_text_mode_file_reads_its_binary_buffer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'people.txt')
+            with open(file_path, 'wb') as file:
+                file.write('José    Málaga   39\n'.encode('latin-1'))
+            with open(file_path, 'r', encoding='latin-1') as file:
+                records = FileRipper().rip_file(file, FileDefinition(self.file_data))[fc.RECORDS]
+            with open(file_path, 'r', encoding='latin-1') as file:
+                iterated = list(FileRipper().iter_file(file, FileDefinition(self.file_data)))
+        self.assertEqual([{'name': 'José', 'city': 'Málaga', 'age': 39}], records)
+        self.assertEqual(records, iterated)
+
+    def test_iter_file_given_text_stream_without_buffer(self):
+        file = io.StringIO('José    Málaga   39\n')
+        with self.assertRaisesRegex(TypeError, 'open the file in binary mode'):
+            list(FileRipper().iter_file(file, FileDefinition(self.file_data)))
+
+    def test_process_path_given_delimited_file_with_quoted_fields(self):
+        self.file_data[fc.FILE_TYPE] = fc.DELIMITED
+        self.file_data[fc.DELIMITER] = ','
+        self.file_data[fc.QUOTE_CHARACTER] = '"'
+        self.file_data[fc.ENCODING] = 'utf-8'
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'people.txt')
+            with open(file_path, 'wb') as file:
+                file.write('José,Málaga,39\n"Zoë, Jr.","New\nYork",4\n'.encode('utf-8'))
+            records = self.create_file_service().process_path(file_path)[fc.RECORDS]
+        self.assertEqual([{'name': 'José', 'city': 'Málaga', 'age': 39},
+                          {'name': 'Zoë, Jr.', 'city': 'New\nYork', 'age': 4}], records)
+
+
+class FileColumnsTests(unittest.TestCase):
+    def setUp(self):
+        self.records = [{'name': 'Aaron', 'age': '39'}, {'name': 'Gene', 'age': '61'}]
+
+    def test_create_columns(self):
+        columns = create_columns(['name', 'age'], iter(self.records))
+        self.assertEqual(['Aaron', 'Gene'], list(columns['name']))
+        self.assertEqual(['39', '61'], list(columns['age']))
+
+    def test_create_columns_stores_strings_compactly(self):
+        column = create_columns(['name'], self.records)['name']
+        self.assertTrue(isinstance(column, StringColumn))
+        self.assertEqual('AaronGene', column.data)
+        self.assertEqual('Gene', column[-1])
+        self.assertEqual(['Aaron'], column[0:1])
+        self.assertRaises(IndexError, column.__getitem__, 2)
+
+    @patch('filecolumns.STRING_CHUNK_SIZE', 2)
+    def test_create_columns_keeps_missing_values(self):
+        self.records.append({'name': None, 'age': '4'})
+        self.assertEqual(['Aaron', 'Gene', None], create_columns(['name', 'age'], self.records)['name'])
+
+    @unittest.skipIf(filecolumns.numpy is None, 'numpy is not installed')
+    def test_create_columns_given_numeric_values(self):
+        records = [{'age': 39, 'height': 1.8}, {'age': 61, 'height': 1.7}]
+        columns = create_columns(['age', 'height'], records)
+        self.assertEqual('int64', str(columns['age'].dtype))
+        self.assertEqual([1.8, 1.7], list(columns['height']))
+
+    @patch('filecolumns.numpy', None)
+    def test_create_columns_given_numeric_values_without_numpy(self):
+        columns = create_columns(['age'], [{'age': 39}, {'age': 61}])
+        self.assertEqual('q', columns['age'].typecode)
+        self.assertEqual([39, 61], list(columns['age']))
+
 
 class XmlFileServiceTests(FileServiceTests):
     def setUp(self):
@@ -414,6 +1106,28 @@ class XmlFileServiceTests(FileServiceTests):
             self.write_xml_record('Mason', 12, '04/13/2007')
             f.write('</people>\n')
 
+    def test_iter_records_streams_records_as_elements_close(self):
+        lines = iter(['<people>\n', '<person><name>Aaron</name><age>39</age><dob>09/04/1980</dob></person>\n',
+                      '<person><name>Gene</name><age>61</age><dob>01/15/1958</dob></person>\n', '</people>\n'])
+        records = self.file_service.iter_file_records(lines)
+        self.assertEqual('Aaron', next(records)['name'])
+        self.assertEqual(2, len(list(lines)))
+
+    def test_iter_records_ignores_nested_record_elements(self):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>\n', '<people><group><person><name>Gene</name></person>',
+                 '</group><person><name>Aaron</name><age>39</age><dob>09/04/1980</dob></person></people>']
+        records = list(self.file_service.iter_file_records(lines))
+        self.assertEqual([{'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'}], records)
+
+    def test_iter_raw_records_given_binary_file(self):
+        file = io.BytesIO(b'<people><person><name>Aaron</name><age>39</age><dob>09/04/1980</dob></person></people>')
+        records = list(self.file_service.iter_raw_records(file))
+        self.assertEqual([{'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'}], records)
+
+    def test_iter_records_given_malformed_file(self):
+        records = self.file_service.iter_file_records(['<people><person>'])
+        self.assertRaises(ParseError, list, records)
+
     def write_xml_record(self, name, age, dob):
         self.file.write('\t<person>\n')
         self.file.write(f'\t\t<name>{name}</name>\n')
@@ -431,6 +1145,11 @@ class XmlFileServiceTests(FileServiceTests):
             self.file_definition.field_definitions.append(FieldDefinition({fc.FIELD_NAME: 'address'}, fc.XML))
             self.assertRaises(AttributeError, self.file_service.process, file)
 
+    def test_iter_records(self):
+        with open(self.file_name, 'r') as file:
+            file_output = {fc.FILE_NAME: file.name, fc.RECORDS: list(self.file_service.iter_records(file))}
+            self.assert_valid_file_output(file_output, self.file_name)
+
 
 class DatabaseExporterTests(unittest.TestCase):
     def setUp(self) -> None:
@@ -461,10 +1180,29 @@ class FileRipper2Tests(FileServiceTests):
         self.assertIs(self.expected, actual)
         self.delete_files()
 
+    def test_rip_file_given_columnar_layout(self):
+        self.file_service.process_columns = Mock(return_value=self.expected)
+        actual = self.file_ripper.rip_file({}, self.file_definition, fc.COLUMNAR_LAYOUT)
+        self.file_service.process_columns.assert_called_once_with({})
+        self.assertIs(self.expected, actual)
+
+    def test_rip_file_given_invalid_layout(self):
+        self.assertRaises(ValueError, self.file_ripper.rip_file, {}, self.file_definition, 'layout')
+
     def test_rip_file_not_a_file(self):
         self.file_service.process = Mock(side_effect=AttributeError)
         self.assertRaises(AttributeError, self.file_ripper.rip_file, {}, self.file_definition)
 
+    def test_iter_file_returns_record_iterator(self):
+        expected = iter([{}])
+        self.file_service.iter_records = Mock(return_value=expected)
+        file_names = self.create_files()
+        with open(file_names[0], 'r') as file:
+            actual = self.file_ripper.iter_file(file, self.file_definition)
+            self.file_service.iter_records.assert_called_once_with(file)
+        self.assertIs(expected, actual)
+        self.delete_files()
+
     def test_rip_files_returns_file_output_list(self):
         file_count = 2
         file_names = self.create_files(file_count)
@@ -480,6 +1218,63 @@ class FileRipper2Tests(FileServiceTests):
         self.file_service.process = Mock(side_effect=AttributeError)
         self.assertRaises(AttributeError, self.file_ripper.rip_files, [{}, {}], self.file_definition)
 
+    def test_rip_files_given_workers_keeps_input_order(self):
+        self.file_service.process = Mock(side_effect=lambda f: {fc.FILE_NAME: f.name})
+        file_count = 3
+        file_names = self.create_files(file_count)
+        files = [open(file_name, 'r') for file_name in file_names]
+        actual = self.file_ripper.rip_files(files, self.file_definition, workers=2)
+        [f.close() for f in files]
+        self.assertEqual(file_names, [output[fc.FILE_NAME] for output in actual])
+        self.delete_files(file_count)
+
+    def test_rip_files_given_workers_reports_file_errors(self):
+        error = AttributeError()
+        self.file_service.process = Mock(side_effect=[self.expected, error])
+        files = [Mock(), Mock()]
+        actual = self.file_ripper.rip_files(files, self.file_definition, workers=1)
+        self.assertIs(self.expected, actual[0])
+        self.assertIs(files[1].name, actual[1][fc.FILE_NAME])
+        self.assertIs(error, actual[1][fc.ERROR])
+
+    def test_rip_files_given_process_pool(self):
+        file_ripper = FileRipper()
+        with open(self.file_name_for_fixed_file(), 'w') as file:
+            file.write('Name         Age      DOB       \n')
+            file.write('Aaron        39       09/04/1980\n')
+        with open(self.file_name, 'r') as file:
+            actual = file_ripper.rip_files([file], self.file_definition, workers=2, pool_type=fc.PROCESS_POOL)
+        self.assertEqual([{fc.FILE_NAME: self.file_name, fc.RECORDS: [{'name': 'Aaron', 'age': '39',
+                                                                        'dob': '09/04/1980'}]}], actual)
+
+    def test_rip_files_given_process_pool_and_compact_records(self):
+        with open(self.file_name_for_fixed_file(), 'w') as file:
+            file.write('Name         Age      DOB       \n')
+            file.write('Aaron        39       09/04/1980\n')
+            file.write('Gene         61       01/15/1958\n')
+        for file_data in [{fc.COMPACT_RECORDS: True}, {fc.ENCODING: 'latin-1'}]:
+            file_definition = FileDefinition({**self.file_data, **file_data})
+            with open(self.file_name, 'r') as file:
+                actual = FileRipper().rip_files([file], file_definition, workers=1, pool_type=fc.PROCESS_POOL)
+            records = actual[0][fc.RECORDS]
+            self.assertIsInstance(records[0], CompactRecord)
+            self.assertIs(type(records[0]), type(records[1]))
+            self.assertEqual([{'name': 'Aaron', 'age': '39', 'dob': '09/04/1980'},
+                              {'name': 'Gene', 'age': '61', 'dob': '01/15/1958'}], records)
+
+    def test_rip_files_given_invalid_pool_type(self):
+        self.assertRaises(ValueError, self.file_ripper.rip_files, [{}], self.file_definition, 1, 'pool_type')
+
+    def test_iter_rip_files_yields_each_file_output(self):
+        self.file_service.process = Mock(side_effect=lambda f: {fc.FILE_NAME: f.name})
+        files = [Mock(), Mock(), Mock()]
+        actual = list(self.file_ripper.iter_rip_files(files, self.file_definition, workers=3))
+        self.assertCountEqual([f.name for f in files], [output[fc.FILE_NAME] for output in actual])
+
+    def file_name_for_fixed_file(self):
+        self.file_name = 'Valid-fixed-pool.txt'
+        return self.file_name
+
     @staticmethod
     def create_files(total_files=1):
         file_names = []
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from file_ripper_benchmarks.suite import FILE_TYPES, STAGES, compare_to_baseline, parse_size, read_results, \
+    run_suite, write_results
+
+
+def parse_list(value: str):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m file_ripper_benchmarks',
+                                     description='Measure file_ripper throughput and memory on synthetic files')
+    parser.add_argument('--types', default=','.join(FILE_TYPES), help='file types to generate')
+    parser.add_argument('--sizes', default='1MB,10MB', help='file sizes, e.g. 1MB,100MB,10GB')
+    parser.add_argument('--fields', default='5,50,500', help='field counts per record')
+    parser.add_argument('--stages', default=','.join(STAGES), help='code paths to measure')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'file_ripper_benchmarks'),
+                        help='directory for generated files, reused between runs')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='baseline JSON results to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='write these results to --baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed fractional regression')
+    options = parser.parse_args(args)
+
+    os.makedirs(options.work_dir, exist_ok=True)
+    suite_results = run_suite(parse_list(options.types), [int(count) for count in parse_list(options.fields)],
+                              [parse_size(size) for size in parse_list(options.sizes)],
+                              parse_list(options.stages), options.work_dir,
+                              lambda result: print(f"{result['file_type']:<9} {result['field_count']:>4} fields "
+                                                   f"{result['size']:>6} {result['stage']:<24} "
+                                                   f"{result['rows_per_sec']:>12,.0f} rows/sec "
+                                                   f"{result['mb_per_sec']:>8,.1f} MB/sec "
+                                                   f"{result['peak_rss_kb']:>10,} KB peak"))
+    write_results(options.output, suite_results)
+
+    if options.baseline and options.update_baseline:
+        write_results(options.baseline, suite_results)
+        print(f'Baseline written to {options.baseline}')
+    elif options.baseline:
+        regressions = compare_to_baseline(suite_results, read_results(options.baseline), options.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No regressions against {options.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
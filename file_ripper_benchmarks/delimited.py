@@ -0,0 +1,63 @@
+import argparse
+from time import perf_counter
+
+import file_ripper.fileconstants as fc
+from file_ripper.filedefinition import FileDefinition
+from file_ripper.fileservice import DelimitedFileService
+
+
+def create_file_definition(field_count, delimiter):
+    return FileDefinition({
+        fc.FILE_MASK: '*.csv',
+        fc.FILE_TYPE: fc.DELIMITED,
+        fc.DELIMITER: delimiter,
+        fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.FILE_EXPORT, fc.OUTPUT_FILE_PATH: 'output'},
+        fc.FIELD_DEFINITIONS: [{fc.FIELD_NAME: f'field_{i}'} for i in range(field_count)]
+    })
+
+
+def create_lines(row_count, field_count, delimiter):
+    line = delimiter.join(f'value {i}' for i in range(field_count)) + '\n'
+    return [line] * row_count
+
+
+def decode_split(file_definition, line):
+    fields = [field.rstrip() for field in line.split(file_definition.delimiter)]
+    record = {}
+
+    field_count = len(file_definition.field_definitions)
+    if field_count != len(fields):
+        raise OSError('File records do not match file definition')
+
+    for i in range(0, field_count):
+        record[file_definition.field_definitions[i].field_name] = fields[i]
+    return record
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Compare the split-based and compiled delimited parsers')
+    parser.add_argument('--fields', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--delimiter', default=',')
+    options = parser.parse_args(args)
+
+    file_definition = create_file_definition(options.fields, options.delimiter)
+    lines = create_lines(options.rows, options.fields, options.delimiter)
+
+    start = perf_counter()
+    for line in lines:
+        decode_split(file_definition, line)
+    split_rate = options.rows / (perf_counter() - start)
+
+    start = perf_counter()
+    for _ in DelimitedFileService(file_definition).iter_file_records(lines):
+        pass
+    compiled_rate = options.rows / (perf_counter() - start)
+
+    print(f'fields={options.fields} rows={options.rows}')
+    print(f'split parser:    {split_rate:,.0f} rows/sec')
+    print(f'compiled parser: {compiled_rate:,.0f} rows/sec ({compiled_rate / split_rate:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+from time import perf_counter
+
+import file_ripper.fileconstants as fc
+from file_ripper.filedefinition import FieldDefinition
+from file_ripper.fileservice import FixedRecordDecoder
+
+
+def create_field_definitions(field_count, field_length):
+    return [FieldDefinition({fc.FIELD_NAME: f'field_{i}', fc.START_POSITION: i * field_length,
+                             fc.FIELD_LENGTH: field_length}, fc.FIXED) for i in range(field_count)]
+
+
+def create_lines(row_count, field_count, field_length):
+    line = ''.join(f'v{i}'.ljust(field_length) for i in range(field_count - 1)) + 'x' * field_length + '\n'
+    return [line] * row_count
+
+
+def decode_per_field(field_definitions, line):
+    record = {}
+    for field_def in field_definitions:
+        end_position = field_def.start_position + field_def.field_length
+        if end_position > len(line.rstrip()):
+            raise IndexError(f'field {field_def.field_name} extends past the end of line')
+        record[field_def.field_name] = line[field_def.start_position:end_position].rstrip()
+    return record
+
+
+def measure(decode, lines):
+    start = perf_counter()
+    for line in lines:
+        decode(line)
+    return len(lines) / (perf_counter() - start)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Compare per-field and compiled fixed-width decoding')
+    parser.add_argument('--fields', type=int, default=120)
+    parser.add_argument('--field-length', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=50000)
+    options = parser.parse_args(args)
+
+    field_definitions = create_field_definitions(options.fields, options.field_length)
+    lines = create_lines(options.rows, options.fields, options.field_length)
+    decoder = FixedRecordDecoder(field_definitions)
+
+    per_field = measure(lambda line: decode_per_field(field_definitions, line), lines)
+    compiled = measure(decoder.decode, lines)
+    print(f'fields={options.fields} rows={options.rows}')
+    print(f'per-field decoder: {per_field:,.0f} rows/sec')
+    print(f'compiled decoder:  {compiled:,.0f} rows/sec ({compiled / per_field:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
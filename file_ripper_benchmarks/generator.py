@@ -0,0 +1,72 @@
+import os
+
+import file_ripper.fileconstants as fc
+
+
+FIELD_LENGTH = 10
+RECORD_ELEMENT_NAME = 'record'
+WRITE_BUFFER_SIZE = 1024 * 1024
+BLOCK_ROWS = 1000
+
+
+def create_file_definition_data(file_type: str, field_count: int, input_directory: str, file_mask: str) -> dict:
+    file_data = {
+        fc.FILE_MASK: file_mask,
+        fc.FILE_TYPE: file_type,
+        fc.HAS_HEADER: file_type != fc.XML,
+        fc.INPUT_DIRECTORY: input_directory,
+        fc.FILE_DESCRIPTION: f'synthetic {file_type} file with {field_count} fields',
+        fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.FILE_EXPORT, fc.OUTPUT_FILE_PATH: os.devnull},
+        fc.FIELD_DEFINITIONS: [{fc.FIELD_NAME: f'field_{i}'} for i in range(field_count)]
+    }
+    if file_type == fc.DELIMITED:
+        file_data[fc.DELIMITER] = ','
+    if file_type == fc.FIXED:
+        for i, field_data in enumerate(file_data[fc.FIELD_DEFINITIONS]):
+            field_data[fc.START_POSITION] = i * FIELD_LENGTH
+            field_data[fc.FIELD_LENGTH] = FIELD_LENGTH
+    if file_type == fc.XML:
+        file_data[fc.RECORD_ELEMENT_NAME] = RECORD_ELEMENT_NAME
+    return file_data
+
+
+def create_field_values(row_number: int, field_count: int):
+    return [f'{row_number + i:0{FIELD_LENGTH}d}'[-FIELD_LENGTH:] for i in range(field_count)]
+
+
+def create_header(file_type: str, field_count: int) -> str:
+    field_names = [f'field_{i}' for i in range(field_count)]
+    if file_type == fc.DELIMITED:
+        return ','.join(field_names) + '\n'
+    if file_type == fc.FIXED:
+        return ''.join(name[:FIELD_LENGTH].ljust(FIELD_LENGTH) for name in field_names) + '\n'
+    return '<records>\n'
+
+
+def create_row(file_type: str, row_number: int, field_count: int) -> str:
+    values = create_field_values(row_number, field_count)
+    if file_type == fc.DELIMITED:
+        return ','.join(values) + '\n'
+    if file_type == fc.FIXED:
+        return ''.join(values) + '\n'
+    fields = ''.join(f'<field_{i}>{value}</field_{i}>' for i, value in enumerate(values))
+    return f'<{RECORD_ELEMENT_NAME}>{fields}</{RECORD_ELEMENT_NAME}>\n'
+
+
+def write_synthetic_file(file_path: str, file_type: str, field_count: int, target_bytes: int) -> int:
+    footer = '</records>\n' if file_type == fc.XML else ''
+    rows = [create_row(file_type, i, field_count) for i in range(BLOCK_ROWS)]
+    block = ''.join(rows)
+    row_count = 0
+    with open(file_path, 'w', buffering=WRITE_BUFFER_SIZE) as file:
+        written = file.write(create_header(file_type, field_count)) + len(footer)
+        while written + len(block) <= target_bytes:
+            written += file.write(block)
+            row_count += BLOCK_ROWS
+        for row in rows:
+            if written >= target_bytes:
+                break
+            written += file.write(row)
+            row_count += 1
+        file.write(footer)
+    return row_count
@@ -0,0 +1,145 @@
+import json
+import os
+import platform
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+
+import file_ripper.fileconstants as fc
+from file_ripper.filedefinition import FileDefinition
+from file_ripper_benchmarks.generator import create_file_definition_data, write_synthetic_file
+
+
+RIP_FILE = 'rip_file'
+ITER_FILE = 'iter_file'
+PROCESS_FILE_DEFINITION = 'process_file_definition'
+STAGES = [RIP_FILE, ITER_FILE, PROCESS_FILE_DEFINITION]
+FILE_TYPES = [fc.DELIMITED, fc.FIXED, fc.XML]
+PROCESS_BATCH_SIZE = 1000
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+class CountingExporter:
+    def __init__(self):
+        self.rows = 0
+
+    def export_data(self, data):
+        self.rows += len(data[fc.RECORDS])
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    for unit, multiplier in SIZE_UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * multiplier)
+    return int(size)
+
+
+def format_size(size_bytes: int) -> str:
+    for unit, multiplier in reversed(list(SIZE_UNITS.items())):
+        if size_bytes >= multiplier and size_bytes % multiplier == 0:
+            return f'{size_bytes // multiplier}{unit}'
+    return str(size_bytes)
+
+
+def prepare_file(work_directory: str, file_type: str, field_count: int, size_bytes: int):
+    file_name = f'{file_type.lower()}-{field_count}-{format_size(size_bytes)}.dat'
+    file_path = os.path.join(work_directory, file_name)
+    file_data = create_file_definition_data(file_type, field_count, work_directory, file_name)
+    file_data[fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = PROCESS_BATCH_SIZE
+    if not os.path.exists(file_path) or os.path.getsize(file_path) < size_bytes:
+        write_synthetic_file(file_path, file_type, field_count, size_bytes)
+    return file_path, file_data
+
+
+def run_stage(stage: str, file_path: str, file_data: dict) -> dict:
+    from file_ripper.fileripper import FileRipper
+    if stage == PROCESS_FILE_DEFINITION:
+        from file_ripper_process.process import process_file_definition
+
+    file_definition = FileDefinition(file_data)
+    mode = 'rb' if file_definition.encoding else 'r'
+    start = perf_counter()
+    if stage == RIP_FILE:
+        with open(file_path, mode) as file:
+            rows = len(FileRipper().rip_file(file, file_definition)[fc.RECORDS])
+    elif stage == ITER_FILE:
+        with open(file_path, mode) as file:
+            rows = sum(1 for _ in FileRipper().iter_file(file, file_definition))
+    elif stage == PROCESS_FILE_DEFINITION:
+        exporter = CountingExporter()
+        process_file_definition(file_definition, lambda _: exporter, lambda *_: None)
+        rows = exporter.rows
+    else:
+        raise ValueError(f'unsupported benchmark stage: {stage}')
+    seconds = perf_counter() - start
+
+    return {'rows': rows, 'seconds': seconds, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run_case(file_type: str, field_count: int, size_bytes: int, stage: str, work_directory: str) -> dict:
+    file_path, file_data = prepare_file(work_directory, file_type, field_count, size_bytes)
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        measurement = executor.submit(run_stage, stage, file_path, file_data).result()
+
+    file_mb = os.path.getsize(file_path) / SIZE_UNITS['MB']
+    return {
+        'file_type': file_type,
+        'field_count': field_count,
+        'size': format_size(size_bytes),
+        'stage': stage,
+        'rows': measurement['rows'],
+        'seconds': round(measurement['seconds'], 4),
+        'rows_per_sec': round(measurement['rows'] / measurement['seconds'], 1),
+        'mb_per_sec': round(file_mb / measurement['seconds'], 2),
+        'peak_rss_kb': measurement['peak_rss_kb']
+    }
+
+
+def run_suite(file_types, field_counts, sizes, stages, work_directory: str, progress=None) -> dict:
+    results = []
+    for file_type in file_types:
+        for field_count in field_counts:
+            for size_bytes in sizes:
+                for stage in stages:
+                    result = run_case(file_type, field_count, size_bytes, stage, work_directory)
+                    if progress:
+                        progress(result)
+                    results.append(result)
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+
+def case_key(result: dict) -> str:
+    return f"{result['file_type']}/{result['field_count']}/{result['size']}/{result['stage']}"
+
+
+def compare_to_baseline(suite_results: dict, baseline: dict, tolerance: float):
+    baseline_results = {case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in suite_results['results']:
+        expected = baseline_results.get(case_key(result))
+        if expected is None:
+            continue
+        if result['rows_per_sec'] < expected['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{case_key(result)}: {result['rows_per_sec']:,.0f} rows/sec is below baseline "
+                               f"{expected['rows_per_sec']:,.0f} rows/sec")
+        if result['peak_rss_kb'] > expected['peak_rss_kb'] * (1 + tolerance):
+            regressions.append(f"{case_key(result)}: peak RSS {result['peak_rss_kb']:,} KB is above baseline "
+                               f"{expected['peak_rss_kb']:,} KB")
+    return regressions
+
+
+def write_results(file_path: str, suite_results: dict) -> None:
+    with open(file_path, 'w') as file:
+        json.dump(suite_results, file, indent=2)
+
+
+def read_results(file_path: str) -> dict:
+    with open(file_path, 'r') as file:
+        return json.load(file)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import file_ripper.fileconstants as fc
+from file_ripper.filedefinition import FileDefinition
+from file_ripper.fileservice import FileService
+from file_ripper_benchmarks.generator import create_file_definition_data, write_synthetic_file
+from file_ripper_benchmarks.suite import ITER_FILE, RIP_FILE, compare_to_baseline, format_size, parse_size, run_stage
+
+
+class GeneratorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def test_write_synthetic_file_parses_for_each_file_type(self):
+        for file_type in [fc.DELIMITED, fc.FIXED, fc.XML]:
+            file_path = os.path.join(self.directory.name, f'{file_type}.dat')
+            row_count = write_synthetic_file(file_path, file_type, 7, 64 * 1024)
+            file_definition = FileDefinition(create_file_definition_data(file_type, 7, self.directory.name, '*.dat'))
+            with open(file_path, 'r') as file:
+                records = list(FileService.create_file_service(file_definition).iter_records(file))
+            self.assertEqual(row_count, len(records))
+            self.assertEqual(7, len(records[-1]))
+            self.assertGreaterEqual(os.path.getsize(file_path), 64 * 1024)
+
+    def test_run_stage_given_encoding(self):
+        file_path = os.path.join(self.directory.name, 'fixed.dat')
+        row_count = write_synthetic_file(file_path, fc.FIXED, 7, 16 * 1024)
+        file_data = create_file_definition_data(fc.FIXED, 7, self.directory.name, '*.dat')
+        file_data[fc.ENCODING] = 'latin-1'
+        for stage in [RIP_FILE, ITER_FILE]:
+            self.assertEqual(row_count, run_stage(stage, file_path, file_data)['rows'])
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+
+class SuiteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.baseline = {'results': [{'file_type': fc.FIXED, 'field_count': 5, 'size': '1MB', 'stage': 'iter_file',
+                                      'rows_per_sec': 1000.0, 'peak_rss_kb': 1000}]}
+
+    def test_parse_size(self):
+        self.assertEqual(1024 ** 2, parse_size('1MB'))
+        self.assertEqual(10 * 1024 ** 3, parse_size('10gb'))
+        self.assertEqual(512, parse_size('512'))
+
+    def test_format_size(self):
+        self.assertEqual('10GB', format_size(10 * 1024 ** 3))
+        self.assertEqual('1MB', format_size(1024 ** 2))
+
+    def test_compare_to_baseline_within_tolerance(self):
+        results = {'results': [dict(self.baseline['results'][0], rows_per_sec=850.0, peak_rss_kb=1150)]}
+        self.assertEqual([], compare_to_baseline(results, self.baseline, 0.2))
+
+    def test_compare_to_baseline_reports_regressions(self):
+        results = {'results': [dict(self.baseline['results'][0], rows_per_sec=500.0, peak_rss_kb=5000)]}
+        self.assertEqual(2, len(compare_to_baseline(results, self.baseline, 0.2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
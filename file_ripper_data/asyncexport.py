@@ -0,0 +1,26 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import fileconstants as fc
+from filedefinition import ExportDefinition
+from file_ripper_data.dataexport import create_data_exporter
+
+
+def create_async_data_exporter(export_definition: ExportDefinition, data_exporter_factory=create_data_exporter):
+    if export_definition.export_type not in [fc.API_EXPORT, fc.DATABASE_EXPORT]:
+        return None
+    executor = ThreadPoolExecutor(max_workers=max(export_definition.max_in_flight, 1))
+    return AsyncDataExporter(data_exporter_factory(export_definition), executor)
+
+
+class AsyncDataExporter:
+    def __init__(self, data_exporter, executor: Executor):
+        self.data_exporter = data_exporter
+        self.executor = executor
+
+    async def export_data(self, data):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.data_exporter.export_data, data)
+
+    def close(self):
+        self.executor.shutdown()
@@ -1,19 +1,161 @@
+import atexit
+import importlib
+import re
+import sqlite3
+from itertools import chain, islice
+from threading import Lock
+from urllib.parse import unquote, urlsplit
+
 import pymongo
 
+import fileconstants as fc
 from filedefinition import ExportDefinition
+from filerecords import as_document, encode_sql_value
+
+
+DEFAULT_INSERT_BATCH_SIZE = 1000
+MONGO_SCHEMES = ('', 'mongodb', 'mongodb+srv')
+SQLITE_SCHEME = 'sqlite'
+SQL_DRIVERS = {'postgresql': 'psycopg2', 'postgres': 'psycopg2', 'mysql': 'pymysql', 'mssql': 'pymssql'}
+PARAMETER_MARKERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+SQL_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+
+mongo_clients = {}
+mongo_clients_lock = Lock()
 
 
 def create_db_sender(export_definition: ExportDefinition):
-    return MongoDbSender(export_definition)
+    if get_connection_scheme(export_definition.db_connection_string) in MONGO_SCHEMES:
+        return MongoDbSender(export_definition)
+    return SqlDbSender(export_definition)
+
+
+def get_connection_scheme(connection_string: str) -> str:
+    return connection_string.split('://', 1)[0].lower() if '://' in connection_string else ''
+
+
+def connect_sql_database(connection_string: str):
+    scheme = get_connection_scheme(connection_string)
+    if scheme == SQLITE_SCHEME:
+        database_path = connection_string[len('sqlite://'):]
+        database_path = database_path[1:] if database_path.startswith('/') else database_path
+        return sqlite3.connect(database_path or ':memory:', check_same_thread=False), sqlite3.paramstyle
+    if scheme not in SQL_DRIVERS:
+        raise ValueError(f'unsupported database connection scheme: {scheme}')
+
+    driver = importlib.import_module(SQL_DRIVERS[scheme])
+    url = urlsplit(connection_string)
+    connect_arguments = {'host': url.hostname, 'port': url.port, 'user': unquote(url.username or ''),
+                         'password': unquote(url.password or ''), 'database': url.path.lstrip('/')}
+    return driver.connect(**{name: value for name, value in connect_arguments.items() if value}), driver.paramstyle
+
+
+def create_insert_statement(table_name: str, column_names, paramstyle: str) -> str:
+    for identifier in [table_name, *column_names]:
+        if not SQL_IDENTIFIER.match(identifier):
+            raise ValueError(f'invalid sql identifier: {identifier}')
+    if paramstyle == 'numeric':
+        markers = [f':{position}' for position in range(1, len(column_names) + 1)]
+    elif paramstyle == 'named':
+        markers = [f':{column_name}' for column_name in column_names]
+    else:
+        markers = [PARAMETER_MARKERS[paramstyle]] * len(column_names)
+    return f'INSERT INTO {table_name} ({", ".join(column_names)}) VALUES ({", ".join(markers)})'
+
+
+def get_mongo_client(connection_string: str) -> pymongo.MongoClient:
+    with mongo_clients_lock:
+        if connection_string not in mongo_clients:
+            mongo_clients[connection_string] = pymongo.MongoClient(connection_string, tlsAllowInvalidCertificates=True)
+        return mongo_clients[connection_string]
+
+
+@atexit.register
+def close_mongo_clients() -> None:
+    with mongo_clients_lock:
+        for client in mongo_clients.values():
+            client.close()
+        mongo_clients.clear()
 
 
 class MongoDbSender:
-    def __init__(self, export_definition: ExportDefinition):
+    def __init__(self, export_definition: ExportDefinition, client_factory=get_mongo_client):
         self.connection_string = export_definition.db_connection_string
         self.database_name = export_definition.database_name
         self.collection_name = export_definition.collection_name
+        self.write_concern = export_definition.write_concern
+        self.insert_batch_size = export_definition.batch_size or DEFAULT_INSERT_BATCH_SIZE
+        self.client_factory = client_factory
+
+    def get_collection(self):
+        client = self.client_factory(self.connection_string)
+        collection = client[self.database_name][self.collection_name]
+        if self.write_concern:
+            collection = collection.with_options(write_concern=pymongo.WriteConcern(**self.write_concern))
+        return collection
+
+    def send_data(self, data):
+        collection = self.get_collection()
+        inserted_ids = []
+        records = map(as_document, data)
+        batch = list(islice(records, self.insert_batch_size))
+        while batch:
+            inserted_ids.extend(collection.insert_many(batch, ordered=False).inserted_ids)
+            batch = list(islice(records, self.insert_batch_size))
+        return inserted_ids
+
+
+class SqlDbSender:
+    def __init__(self, export_definition: ExportDefinition, connection_factory=connect_sql_database):
+        self.connection_string = export_definition.db_connection_string
+        self.table_name = export_definition.table_name or export_definition.collection_name
+        self.transaction_size = export_definition.transaction_size
+        self.connection_factory = connection_factory
+        self.connection = None
+        self.paramstyle = None
+        self.lock = Lock()
+        if not self.table_name:
+            raise ValueError(f'{fc.TABLE_NAME} is required for sql {fc.DATABASE_EXPORT} exports')
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection, self.paramstyle = self.connection_factory(self.connection_string)
+        return self.connection
 
     def send_data(self, data):
-        client = pymongo.MongoClient(self.connection_string, tlsAllowInvalidCertificates=True)
-        db = client[self.database_name]
-        return db[self.collection_name].insert_many(data)
+        records = iter(data)
+        first_record = next(records, None)
+        if first_record is None:
+            return 0
+
+        column_names = list(first_record)
+        rows = (tuple(encode_sql_value(record.get(column_name)) for column_name in column_names)
+                for record in chain([first_record], records))
+        return self.insert_rows(column_names, rows)
+
+    def insert_rows(self, column_names, rows):
+        with self.lock:
+            connection = self.get_connection()
+            statement = create_insert_statement(self.table_name, column_names, self.paramstyle)
+            inserted_rows = 0
+            transaction_size = self.transaction_size or None
+            transaction = list(islice(rows, transaction_size))
+            while transaction:
+                cursor = connection.cursor()
+                try:
+                    cursor.executemany(statement, transaction)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                inserted_rows += len(transaction)
+                transaction = list(islice(rows, transaction_size))
+            return inserted_rows
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
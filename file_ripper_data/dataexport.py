@@ -1,41 +1,356 @@
+import atexit
+import csv
+import gzip
+import io
 import json
+import os
+import shutil
+import tempfile
+import weakref
+import zlib
+from contextlib import closing, suppress
+from datetime import datetime
+from functools import partial
+from threading import Lock
 
 import requests
+from requests.adapters import HTTPAdapter
 
 import fileconstants as fc
+import filemetrics
 from filedefinition import ExportDefinition
+from filerecords import encode_json_value
+from file_ripper_data.databaseutils import create_db_sender
+
+
+DEFAULT_HTTP_POOL_SIZE = 10
+NDJSON_CHUNK_SIZE = 64 * 1024
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+FILE_WRITE_BUFFER_SIZE = 1024 * 1024
+
+api_sessions = {}
+api_sessions_lock = Lock()
+file_exporters = weakref.WeakSet()
 
 
 def create_data_exporter(export_definition: ExportDefinition):
     if export_definition.export_type == fc.API_EXPORT:
-        return ApiExporter(export_definition.api_url, export_definition.http_headers)
+        session = get_api_session(export_definition.http_pool_size)
+        return ApiExporter(export_definition.api_url, export_definition.http_headers,
+                           partial(send_data_to_api, session=session,
+                                   compression=export_definition.http_compression),
+                           partial(stream_data_to_api, session=session,
+                                   compression=export_definition.http_compression))
     if export_definition.export_type == fc.DATABASE_EXPORT:
-        return DatabaseExporter(export_definition.db_connection_string)
+        return DatabaseExporter(export_definition)
     if export_definition.export_type == fc.FILE_EXPORT:
-        return FileExporter(export_definition.output_file_path)
+        return FileExporter(export_definition.output_file_path, export_definition.output_format,
+                            export_definition.output_compression)
     return None
 
 
-def send_data_to_api(data: dict, headers: dict, api_url: str) -> dict:
-    response = requests.post(api_url, data=json.dumps(data), headers=headers)
-    return json.loads(response.text)
+def commit_data_exporter(data_exporter) -> None:
+    if isinstance(data_exporter, FileExporter):
+        data_exporter.commit()
+
+
+def begin_file_export(data_exporter, file_name: str) -> None:
+    if isinstance(data_exporter, FileExporter):
+        data_exporter.begin_file(file_name)
+
+
+def discard_file_export(data_exporter, file_name: str) -> None:
+    if isinstance(data_exporter, FileExporter):
+        data_exporter.discard_file(file_name)
+
+
+def defer_until_committed(data_exporter, file_name: str, callback) -> None:
+    if isinstance(data_exporter, FileExporter):
+        data_exporter.finish_file(file_name, callback)
+    else:
+        callback()
+
+
+def get_api_session(pool_size: int = DEFAULT_HTTP_POOL_SIZE) -> requests.Session:
+    pool_size = pool_size or DEFAULT_HTTP_POOL_SIZE
+    with api_sessions_lock:
+        if pool_size not in api_sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            api_sessions[pool_size] = session
+        return api_sessions[pool_size]
+
+
+@atexit.register
+def close_api_sessions() -> None:
+    with api_sessions_lock:
+        for session in api_sessions.values():
+            session.close()
+        api_sessions.clear()
+
+
+@atexit.register
+def commit_file_exporters() -> None:
+    # only files that finished exporting are in the output, files still in progress are discarded
+    for file_exporter in list(file_exporters):
+        file_exporter.discard_files()
+        file_exporter.commit()
+
+
+def send_data_to_api(data: dict, headers: dict, api_url: str, session: requests.Session = None,
+                     compression: str = '') -> dict:
+    session = session if session is not None else get_api_session()
+    body = json.dumps(data, default=encode_json_value).encode('utf-8')
+    if compression == fc.GZIP:
+        body = gzip.compress(body)
+        headers = {**headers, 'Content-Encoding': fc.GZIP}
+    filemetrics.metrics.increment('export_bytes_total', len(body), exporter=fc.API_EXPORT)
+    response = session.post(api_url, data=body, headers=headers)
+    return response.json()
+
+
+def create_ndjson_chunks(records, compression: str = ''):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compression == fc.GZIP else None
+    buffer = bytearray()
+    for record in records:
+        buffer += json.dumps(record, default=encode_json_value).encode('utf-8')
+        buffer += b'\n'
+        if len(buffer) >= NDJSON_CHUNK_SIZE:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+
+    chunk = compressor.compress(bytes(buffer)) + compressor.flush() if compressor else bytes(buffer)
+    if chunk:
+        yield chunk
+
+
+def stream_data_to_api(records, headers: dict, api_url: str, session: requests.Session = None,
+                       compression: str = '') -> dict:
+    session = session if session is not None else get_api_session()
+    headers = {**headers, 'Content-Type': NDJSON_CONTENT_TYPE}
+    if compression == fc.GZIP:
+        headers['Content-Encoding'] = fc.GZIP
+    response = session.post(api_url, data=create_ndjson_chunks(records, compression), headers=headers)
+    return response.json()
 
 
 class ApiExporter:
-    def __init__(self, api_url, http_headers, api_sender=send_data_to_api):
+    def __init__(self, api_url, http_headers, api_sender=send_data_to_api, api_streamer=stream_data_to_api):
         self.api_url = api_url
         self.api_sender = api_sender
+        self.api_streamer = api_streamer
         self.http_headers = http_headers
 
     def export_data(self, data):
-        self.api_sender(data, self.http_headers, self.api_url)
+        with filemetrics.metrics.time('export_seconds', exporter=fc.API_EXPORT):
+            self.api_sender(data, self.http_headers, self.api_url)
+
+    def export_stream(self, file_name, records):
+        self.api_streamer(records, {**self.http_headers, 'file-name': file_name}, self.api_url)
 
 
 class DatabaseExporter:
-    def __init__(self, db_connection_string):
-        self.db_connection_string = db_connection_string
+    def __init__(self, export_definition: ExportDefinition, db_sender_factory=create_db_sender):
+        self.db_connection_string = export_definition.db_connection_string
+        self.db_sender = db_sender_factory(export_definition)
+
+    def export_data(self, data):
+        with filemetrics.metrics.time('export_seconds', exporter=fc.DATABASE_EXPORT):
+            return self.db_sender.send_data(data[fc.RECORDS])
 
 
 class FileExporter:
-    def __init__(self, output_file_path):
+    def __init__(self, output_file_path, output_format=fc.NDJSON, compression='', clock=datetime.now):
         self.output_file_path = output_file_path
+        self.output_format = output_format
+        self.compression = compression
+        self.clock = clock
+        self.lock = Lock()
+        self.output = None
+        self.segments = {}
+        file_exporters.add(self)
+
+    def export_data(self, data):
+        with filemetrics.metrics.time('export_seconds', exporter=fc.FILE_EXPORT):
+            self.write_records(data[fc.RECORDS], data.get(fc.FILE_NAME))
+
+    def export_stream(self, file_name, records):
+        self.write_records(records, file_name)
+
+    def write_records(self, records, file_name=None):
+        segment = self.segments.get(file_name)
+        if segment is not None:
+            segment.write_records(records)
+            return
+        with self.lock:
+            self.open_output().write_records(records)
+
+    def begin_file(self, file_name):
+        # a file's records are held in their own segment until the whole file has been exported,
+        # so a file that fails partway leaves nothing behind in the output
+        with self.lock:
+            fieldnames = self.output.csv_writer.fieldnames if self.output and self.output.csv_writer else None
+            self.segments[file_name] = FileSegment(self.output_format, fieldnames)
+
+    def finish_file(self, file_name, callback):
+        with self.lock:
+            segment = self.segments.pop(file_name, None)
+            if segment is None:
+                self.add_commit_callback(callback)
+                return
+            with closing(segment):
+                output = self.open_output()
+                try:
+                    output.append_segment(segment)
+                except BaseException:
+                    self.output = None
+                    output.discard()
+                    raise
+            output.commit_callbacks.append(callback)
+
+    def discard_file(self, file_name):
+        with self.lock:
+            segment = self.segments.pop(file_name, None)
+        if segment is not None:
+            segment.close()
+
+    def discard_files(self):
+        with self.lock:
+            segments, self.segments = self.segments, {}
+        for segment in segments.values():
+            segment.close()
+
+    def on_commit(self, callback):
+        with self.lock:
+            self.add_commit_callback(callback)
+
+    def commit(self):
+        with self.lock:
+            self.commit_output()
+
+    def open_output(self):
+        target_path = self.clock().strftime(self.output_file_path)
+        if self.output is not None and self.output.target_path != target_path:
+            self.commit_output()
+        if self.output is None:
+            self.output = OutputFile(target_path, self.output_format, self.compression)
+        return self.output
+
+    def add_commit_callback(self, callback):
+        if self.output is None:
+            callback()
+        else:
+            self.output.commit_callbacks.append(callback)
+
+    def commit_output(self):
+        output, self.output = self.output, None
+        if output is not None:
+            output.commit()
+
+
+class FileSegment:
+    def __init__(self, output_format, fieldnames=None):
+        self.output_format = output_format
+        self.fieldnames = fieldnames
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=FILE_WRITE_BUFFER_SIZE, mode='w+', encoding='utf-8',
+                                                    newline='')
+        self.csv_writer = None
+
+    def write_records(self, records):
+        if self.output_format != fc.CSV:
+            self.buffer.writelines(f'{json.dumps(record, default=encode_json_value)}\n' for record in records)
+            return
+        records = iter(records)
+        if self.csv_writer is None:
+            first_record = next(records, None)
+            if first_record is None:
+                return
+            self.fieldnames = self.fieldnames or list(first_record)
+            self.csv_writer = csv.DictWriter(self.buffer, fieldnames=self.fieldnames, lineterminator='\n')
+            self.csv_writer.writerow(first_record)
+        self.csv_writer.writerows(records)
+
+    def close(self):
+        self.buffer.close()
+
+
+class OutputFile:
+    def __init__(self, target_path, output_format, compression):
+        self.target_path = target_path
+        self.output_format = output_format
+        directory, file_name = os.path.split(os.path.abspath(target_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{file_name}.', suffix='.tmp')
+        self.raw_file = open(temp_fd, 'wb', buffering=FILE_WRITE_BUFFER_SIZE)
+        self.compressed_file = gzip.GzipFile(fileobj=self.raw_file, mode='wb') if compression == fc.GZIP else None
+        self.text_file = io.TextIOWrapper(self.compressed_file or self.raw_file, encoding='utf-8', newline='')
+        self.csv_writer = None
+        self.commit_callbacks = []
+
+    def write_records(self, records):
+        if self.output_format == fc.CSV:
+            self.write_csv_records(records)
+        else:
+            self.text_file.writelines(f'{json.dumps(record, default=encode_json_value)}\n' for record in records)
+
+    def write_csv_records(self, records):
+        records = iter(records)
+        if self.csv_writer is None:
+            first_record = next(records, None)
+            if first_record is None:
+                return
+            self.csv_writer = csv.DictWriter(self.text_file, fieldnames=list(first_record), lineterminator='\n')
+            self.csv_writer.writeheader()
+            self.csv_writer.writerow(first_record)
+        self.csv_writer.writerows(records)
+
+    def append_segment(self, segment: FileSegment):
+        if self.output_format == fc.CSV:
+            if segment.fieldnames is None:
+                return
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.text_file, fieldnames=segment.fieldnames, lineterminator='\n')
+                self.csv_writer.writeheader()
+            if self.csv_writer.fieldnames != segment.fieldnames:
+                segment.buffer.seek(0)
+                self.csv_writer.writerows(csv.DictReader(segment.buffer, fieldnames=segment.fieldnames))
+                return
+        segment.buffer.seek(0)
+        shutil.copyfileobj(segment.buffer, self.text_file)
+
+    def commit(self):
+        try:
+            self.text_file.flush()
+            self.text_file.detach()
+            if self.compressed_file is not None:
+                self.compressed_file.close()
+            self.raw_file.flush()
+            os.fsync(self.raw_file.fileno())
+            self.raw_file.close()
+            os.replace(self.temp_path, self.find_available_path())
+        except BaseException:
+            self.discard()
+            raise
+        for callback in self.commit_callbacks:
+            callback()
+
+    def discard(self):
+        self.commit_callbacks.clear()
+        for file in (self.text_file, self.compressed_file, self.raw_file):
+            if file is not None:
+                with suppress(Exception):
+                    file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def find_available_path(self):
+        root, extension = os.path.splitext(self.target_path)
+        candidate, sequence = self.target_path, 0
+        while os.path.exists(candidate):
+            sequence += 1
+            candidate = f'{root}-{sequence}{extension}'
+        return candidate
@@ -1,10 +1,26 @@
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
 import unittest
-from unittest.mock import Mock
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
 
-from file_ripper_data.databaseutils import create_db_sender, MongoDbSender
-from file_ripper.filedefinition import ExportDefinition
+from file_ripper_data.asyncexport import create_async_data_exporter, AsyncDataExporter
+from file_ripper_data.databaseutils import create_db_sender, MongoDbSender, get_mongo_client, close_mongo_clients, \
+    SqlDbSender, create_insert_statement
+from file_ripper.filedefinition import ExportDefinition, FileDefinition
+from file_ripper.fileservice import FileService
 import file_ripper.fileconstants as fc
-from file_ripper_data.dataexport import create_data_exporter, ApiExporter, DatabaseExporter, FileExporter
+from file_ripper_data.dataexport import create_data_exporter, ApiExporter, DatabaseExporter, FileExporter, \
+    get_api_session, send_data_to_api, stream_data_to_api, create_ndjson_chunks
+from filerecords import create_record_class
 
 
 class CreateDbSenderTests(unittest.TestCase):
@@ -37,6 +53,139 @@ class MongoDbSenderTests(unittest.TestCase):
         self.assertIsNotNone(result)
 
 
+class FakeMongoCollection:
+    def __init__(self):
+        self.inserts = []
+        self.write_concern = None
+
+    def insert_many(self, documents, ordered=True):
+        self.inserts.append((documents, ordered))
+        return Mock(inserted_ids=[document['name'] for document in documents])
+
+    def with_options(self, write_concern=None):
+        self.write_concern = write_concern
+        return self
+
+
+class FakeMongoClient:
+    def __init__(self):
+        self.databases = defaultdict(lambda: defaultdict(FakeMongoCollection))
+
+    def __getitem__(self, database_name):
+        return self.databases[database_name]
+
+
+class MongoDbSenderBatchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = FakeMongoClient()
+        self.export_data = {
+            fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+            fc.COLLECTION_NAME: 'People',
+            fc.DATABASE_NAME: 'gnarly_test',
+            fc.DB_CONNECTION_STRING: 'mongodb://localhost:27017',
+            fc.BATCH_SIZE: 2
+        }
+        self.records = [{'name': name} for name in ['Jim', 'Tom', 'Ann', 'Sue', 'Bob']]
+
+    def test_send_data_inserts_unordered_batches(self):
+        mongo_sender = MongoDbSender(ExportDefinition(self.export_data), lambda _: self.client)
+        inserted_ids = mongo_sender.send_data(self.records)
+        collection = self.client['gnarly_test']['People']
+        self.assertEqual([(self.records[0:2], False), (self.records[2:4], False), (self.records[4:], False)],
+                         collection.inserts)
+        self.assertEqual(['Jim', 'Tom', 'Ann', 'Sue', 'Bob'], inserted_ids)
+
+    def test_send_data_converts_compact_records_to_documents(self):
+        record_class = create_record_class(['name'])
+        mongo_sender = MongoDbSender(ExportDefinition(self.export_data), lambda _: self.client)
+        mongo_sender.send_data([record_class([record['name']]) for record in self.records])
+        inserted = [record for batch, _ in self.client['gnarly_test']['People'].inserts for record in batch]
+        self.assertEqual([dict, dict, dict, dict, dict], [type(record) for record in inserted])
+        self.assertEqual(self.records, inserted)
+
+    def test_send_data_applies_write_concern(self):
+        self.export_data[fc.WRITE_CONCERN] = {'w': 1}
+        mongo_sender = MongoDbSender(ExportDefinition(self.export_data), lambda _: self.client)
+        mongo_sender.send_data(self.records[0:1])
+        self.assertEqual(1, self.client['gnarly_test']['People'].write_concern.document['w'])
+
+    @patch('file_ripper_data.databaseutils.pymongo.MongoClient', side_effect=lambda *args, **kwargs: Mock())
+    def test_get_mongo_client_shares_clients_until_closed(self, mongo_client):
+        client = get_mongo_client('mongodb://localhost:27017')
+        self.assertIs(client, get_mongo_client('mongodb://localhost:27017'))
+        mongo_client.assert_called_once()
+        close_mongo_clients()
+        client.close.assert_called_once()
+        self.assertIsNot(client, get_mongo_client('mongodb://other:27017'))
+        close_mongo_clients()
+
+
+class SqlDbSenderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.database_path = os.path.join(self.directory.name, 'people.db')
+        with sqlite3.connect(self.database_path) as connection:
+            connection.execute('CREATE TABLE people (name TEXT PRIMARY KEY, age TEXT)')
+        connection.close()
+        self.export_definition = ExportDefinition({fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+                                                   fc.DB_CONNECTION_STRING: f'sqlite:///{self.database_path}',
+                                                   fc.TABLE_NAME: 'people',
+                                                   fc.TRANSACTION_SIZE: 2})
+
+    def read_names(self):
+        with sqlite3.connect(self.database_path) as connection:
+            names = [row[0] for row in connection.execute('SELECT name FROM people ORDER BY name')]
+        connection.close()
+        return names
+
+    def test_create_db_sender_given_sqlite_connection_string(self):
+        self.assertTrue(isinstance(create_db_sender(self.export_definition), SqlDbSender))
+
+    def test_send_data_commits_each_transaction(self):
+        connections = []
+
+        def connection_factory(connection_string):
+            connection = sqlite3.connect(self.database_path)
+            connections.append(Mock(wraps=connection))
+            return connections[-1], sqlite3.paramstyle
+
+        sender = SqlDbSender(self.export_definition, connection_factory)
+        inserted_rows = sender.send_data(iter([{'name': f'Person{i}', 'age': str(i)} for i in range(5)]))
+        sender.close()
+        self.assertEqual(5, inserted_rows)
+        self.assertEqual(3, connections[0].commit.call_count)
+        self.assertEqual([f'Person{i}' for i in range(5)], self.read_names())
+
+    def test_send_data_rolls_back_failed_transaction(self):
+        sender = create_db_sender(self.export_definition)
+        self.addCleanup(sender.close)
+        records = [{'name': 'Jason', 'age': '99'}, {'name': 'Jane', 'age': '98'},
+                   {'name': 'John', 'age': '97'}, {'name': 'John', 'age': '96'}]
+        self.assertRaises(sqlite3.IntegrityError, sender.send_data, records)
+        self.assertEqual(['Jane', 'Jason'], self.read_names())
+
+    def test_send_data_given_no_records(self):
+        self.assertEqual(0, create_db_sender(self.export_definition).send_data([]))
+
+    def test_create_insert_statement(self):
+        self.assertEqual('INSERT INTO people (name, age) VALUES (?, ?)',
+                         create_insert_statement('people', ['name', 'age'], 'qmark'))
+        self.assertEqual('INSERT INTO dbo.people (name, age) VALUES (%s, %s)',
+                         create_insert_statement('dbo.people', ['name', 'age'], 'format'))
+        self.assertEqual('INSERT INTO people (name, age) VALUES (:1, :2)',
+                         create_insert_statement('people', ['name', 'age'], 'numeric'))
+
+    def test_create_insert_statement_given_invalid_identifier(self):
+        self.assertRaises(ValueError, create_insert_statement, 'people; DROP TABLE people', ['name'], 'qmark')
+
+    def test_database_exporter_export_data(self):
+        database_exporter = DatabaseExporter(self.export_definition)
+        self.addCleanup(database_exporter.db_sender.close)
+        database_exporter.export_data({fc.FILE_NAME: 'people.csv', fc.RECORDS: [{'name': 'Jason', 'age': '99'}]})
+        self.assertEqual(['Jason'], self.read_names())
+
+
 class CreateDataExporterTests(unittest.TestCase):
     def setUp(self) -> None:
         self.export_data = {}
@@ -73,4 +222,317 @@ class ApiExporterTests(unittest.TestCase):
     def test_export_data(self):
         data = {}
         self.api_exporter.export_data(data)
-        self.api_sender.assert_called_with(data, self.headers, self.api_url)
\ No newline at end of file
+        self.api_sender.assert_called_with(data, self.headers, self.api_url)
+
+    def test_export_stream(self):
+        api_streamer = Mock()
+        api_exporter = ApiExporter(self.api_url, self.headers, self.api_sender, api_streamer)
+        records = iter([{}])
+        api_exporter.export_stream('file name', records)
+        api_streamer.assert_called_with(records, {'file-name': 'file name'}, self.api_url)
+
+
+class FileExporterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.now = datetime(2024, 1, 1, 10)
+        self.records = [{'name': 'Jason', 'age': '99'}, {'name': 'Jane', 'age': '98'}]
+
+    def create_file_exporter(self, file_name, output_format=fc.NDJSON, compression=''):
+        return FileExporter(os.path.join(self.directory.name, file_name), output_format, compression,
+                            clock=lambda: self.now)
+
+    def read_output(self, file_name, opener=open):
+        with opener(os.path.join(self.directory.name, file_name), 'rt', newline='') as file:
+            return file.read()
+
+    def test_export_data_commits_ndjson_atomically(self):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records[:1]})
+        file_exporter.export_stream('b.csv', iter(self.records[1:]))
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, 'output.ndjson')))
+        file_exporter.commit()
+        self.assertEqual(''.join(f'{json.dumps(record)}\n' for record in self.records), self.read_output('output.ndjson'))
+        self.assertEqual(['output.ndjson'], os.listdir(self.directory.name))
+
+    def test_export_data_writes_compact_records(self):
+        record_class = create_record_class(['name', 'age'])
+        file_exporter = self.create_file_exporter('output.ndjson')
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: [record_class(list(record.values()))
+                                                                        for record in self.records]})
+        file_exporter.commit()
+        self.assertEqual(''.join(f'{json.dumps(record)}\n' for record in self.records), self.read_output('output.ndjson'))
+
+    def test_export_data_writes_csv_header_once(self):
+        file_exporter = self.create_file_exporter('output.csv', fc.CSV)
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records[:1]})
+        file_exporter.export_data({fc.FILE_NAME: 'b.csv', fc.RECORDS: self.records[1:]})
+        file_exporter.commit()
+        self.assertEqual('name,age\nJason,99\nJane,98\n', self.read_output('output.csv'))
+
+    def test_export_data_compresses_output(self):
+        file_exporter = self.create_file_exporter('output.ndjson.gz', compression=fc.GZIP)
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records})
+        file_exporter.commit()
+        self.assertEqual(self.records, [json.loads(line) for line in
+                                        self.read_output('output.ndjson.gz', gzip.open).splitlines()])
+
+    def test_export_data_rolls_output_path(self):
+        file_exporter = self.create_file_exporter('output-%H.ndjson')
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records[:1]})
+        self.now = datetime(2024, 1, 1, 11)
+        file_exporter.export_data({fc.FILE_NAME: 'b.csv', fc.RECORDS: self.records[1:]})
+        file_exporter.commit()
+        self.assertEqual(f'{json.dumps(self.records[0])}\n', self.read_output('output-10.ndjson'))
+        self.assertEqual(f'{json.dumps(self.records[1])}\n', self.read_output('output-11.ndjson'))
+
+    def test_on_commit_runs_callbacks_after_output_is_committed(self):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        output_path = os.path.join(self.directory.name, 'output.ndjson')
+        committed = []
+        file_exporter.on_commit(lambda: committed.append('empty'))
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records})
+        file_exporter.on_commit(lambda: committed.append(os.path.exists(output_path)))
+        self.assertEqual(['empty'], committed)
+        file_exporter.commit()
+        self.assertEqual(['empty', True], committed)
+
+    @patch('file_ripper_data.dataexport.os.fsync')
+    def test_export_data_syncs_output_on_commit_only(self, fsync):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        for record in self.records:
+            file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: [record]})
+        fsync.assert_not_called()
+        file_exporter.commit()
+        fsync.assert_called_once()
+
+    def test_commit_does_not_overwrite_existing_output(self):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        for record in self.records:
+            file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: [record]})
+            file_exporter.commit()
+        self.assertEqual(f'{json.dumps(self.records[1])}\n', self.read_output('output-1.ndjson'))
+
+    def test_finish_file_appends_file_records_to_output(self):
+        file_exporter = self.create_file_exporter('output.csv', fc.CSV)
+        committed = []
+        file_exporter.begin_file('a.csv')
+        file_exporter.begin_file('b.csv')
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records[:1]})
+        file_exporter.export_data({fc.FILE_NAME: 'b.csv', fc.RECORDS: [{'age': '98', 'name': 'Jane'}]})
+        file_exporter.finish_file('b.csv', lambda: committed.append('b.csv'))
+        file_exporter.finish_file('a.csv', lambda: committed.append('a.csv'))
+        self.assertEqual([], committed)
+        file_exporter.commit()
+        self.assertEqual(['b.csv', 'a.csv'], committed)
+        self.assertEqual('age,name\n98,Jane\n99,Jason\n', self.read_output('output.csv'))
+
+    def test_discard_file_leaves_records_out_of_output(self):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        file_exporter.begin_file('a.csv')
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records[:1]})
+        file_exporter.finish_file('a.csv', lambda: None)
+        file_exporter.begin_file('b.csv')
+        file_exporter.export_data({fc.FILE_NAME: 'b.csv', fc.RECORDS: self.records[1:]})
+        file_exporter.discard_file('b.csv')
+        file_exporter.commit()
+        self.assertEqual(f'{json.dumps(self.records[0])}\n', self.read_output('output.ndjson'))
+
+    def test_file_exporters_sharing_output_path_commit_separately(self):
+        file_exporters = [self.create_file_exporter('output.ndjson') for _ in range(2)]
+        for file_exporter, record in zip(file_exporters, self.records):
+            file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: [record]})
+        for file_exporter in file_exporters:
+            file_exporter.commit()
+        self.assertEqual([f'{json.dumps(record)}\n' for record in self.records],
+                         [self.read_output('output.ndjson'), self.read_output('output-1.ndjson')])
+
+    @patch('file_ripper_data.dataexport.os.replace', side_effect=OSError('read-only file system'))
+    def test_commit_discards_output_when_commit_fails(self, _):
+        file_exporter = self.create_file_exporter('output.ndjson')
+        committed = []
+        file_exporter.export_data({fc.FILE_NAME: 'a.csv', fc.RECORDS: self.records})
+        file_exporter.on_commit(lambda: committed.append('a.csv'))
+        self.assertRaises(OSError, file_exporter.commit)
+        file_exporter.commit()
+        self.assertEqual([], committed)
+        self.assertEqual([], os.listdir(self.directory.name))
+
+
+class TypedRecordExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        file_definition = FileDefinition({
+            fc.FILE_MASK: '*.txt',
+            fc.FILE_TYPE: fc.DELIMITED,
+            fc.DELIMITER: '|',
+            fc.EXPORT_DEFINITION: {fc.EXPORT_TYPE: fc.FILE_EXPORT, fc.OUTPUT_FILE_PATH: 'output.ndjson'},
+            fc.FIELD_DEFINITIONS: [
+                {fc.FIELD_NAME: 'name'},
+                {fc.FIELD_NAME: 'balance', fc.DATA_TYPE: fc.DECIMAL},
+                {fc.FIELD_NAME: 'dob', fc.DATA_TYPE: fc.DATE},
+                {fc.FIELD_NAME: 'seen', fc.DATA_TYPE: fc.DATETIME}
+            ]
+        })
+        self.records = FileService.create_file_service(file_definition).process_file_records(
+            ['Aaron|10.50|1980-09-04|2024-01-01T10:30:00\n'])
+        self.expected = {'name': 'Aaron', 'balance': '10.50', 'dob': '1980-09-04', 'seen': '2024-01-01T10:30:00'}
+
+    def test_create_ndjson_chunks_given_typed_records(self):
+        body = b''.join(create_ndjson_chunks(self.records))
+        self.assertEqual([self.expected], [json.loads(line) for line in body.splitlines()])
+
+    def test_file_exporter_given_typed_records(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_exporter = FileExporter(os.path.join(directory, 'output.ndjson'))
+            file_exporter.export_data({fc.FILE_NAME: 'a.txt', fc.RECORDS: self.records})
+            file_exporter.commit()
+            with open(os.path.join(directory, 'output.ndjson')) as file:
+                self.assertEqual(self.expected, json.loads(file.read()))
+
+    def test_mongo_sender_given_typed_records(self):
+        client = FakeMongoClient()
+        mongo_sender = MongoDbSender(ExportDefinition({fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+                                                       fc.DB_CONNECTION_STRING: 'mongodb://localhost:27017',
+                                                       fc.DATABASE_NAME: 'gnarly_test',
+                                                       fc.COLLECTION_NAME: 'People'}), lambda _: client)
+        mongo_sender.send_data(self.records)
+        documents, _ = client['gnarly_test']['People'].inserts[0]
+        self.assertEqual([{**self.expected, 'seen': datetime(2024, 1, 1, 10, 30)}], documents)
+
+    def test_sqlite_exporter_given_typed_records(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, 'people.db')
+            with sqlite3.connect(database_path) as connection:
+                connection.execute('CREATE TABLE people (name TEXT, balance TEXT, dob TEXT, seen TEXT)')
+            connection.close()
+            data_exporter = create_data_exporter(ExportDefinition({
+                fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+                fc.DB_CONNECTION_STRING: f'sqlite:///{database_path}',
+                fc.TABLE_NAME: 'people'}))
+            data_exporter.export_data({fc.FILE_NAME: 'a.txt', fc.RECORDS: self.records})
+            data_exporter.db_sender.close()
+            with sqlite3.connect(database_path) as connection:
+                rows = connection.execute('SELECT name, balance, dob, seen FROM people').fetchall()
+            connection.close()
+            self.assertEqual([tuple(self.expected.values())], rows)
+
+
+class AsyncExporterTests(unittest.TestCase):
+    def test_create_async_data_exporter_given_api_export_type(self):
+        export_definition = ExportDefinition({fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'api url'})
+        async_exporter = create_async_data_exporter(export_definition)
+        self.assertTrue(isinstance(async_exporter, AsyncDataExporter))
+        async_exporter.close()
+
+    def test_create_async_data_exporter_given_database_export_type(self):
+        export_definition = ExportDefinition({fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+                                              fc.DB_CONNECTION_STRING: 'connection string'})
+        async_exporter = create_async_data_exporter(export_definition)
+        self.assertTrue(isinstance(async_exporter, AsyncDataExporter))
+        self.assertTrue(isinstance(async_exporter.data_exporter, DatabaseExporter))
+        async_exporter.close()
+
+    def test_async_api_exporter_exports_in_executor(self):
+        api_exporter = Mock()
+        export_definition = ExportDefinition({fc.EXPORT_TYPE: fc.API_EXPORT, fc.API_URL: 'api url',
+                                              fc.MAX_IN_FLIGHT: 2})
+        async_exporter = create_async_data_exporter(export_definition, lambda _: api_exporter)
+        data = {fc.RECORDS: []}
+        asyncio.run(async_exporter.export_data(data))
+        api_exporter.export_data.assert_called_once_with(data)
+        async_exporter.close()
+
+    def test_async_database_exporter_uses_data_exporter_factory(self):
+        database_exporter = Mock()
+        export_definition = ExportDefinition({fc.EXPORT_TYPE: fc.DATABASE_EXPORT,
+                                              fc.DB_CONNECTION_STRING: 'sqlite:///people.db', fc.TABLE_NAME: 'people'})
+        data_exporter_factory = Mock(return_value=database_exporter)
+        async_exporter = create_async_data_exporter(export_definition, data_exporter_factory)
+        data = {fc.FILE_NAME: 'file name', fc.RECORDS: [{'name': 'Jim'}]}
+        asyncio.run(async_exporter.export_data(data))
+        data_exporter_factory.assert_called_once_with(export_definition)
+        database_exporter.export_data.assert_called_once_with(data)
+        async_exporter.close()
+
+    def test_async_data_exporter_exports_in_executor(self):
+        data_exporter = Mock()
+        async_exporter = AsyncDataExporter(data_exporter, ThreadPoolExecutor(max_workers=1))
+        asyncio.run(async_exporter.export_data({fc.FILE_NAME: 'file name', fc.RECORDS: [{'name': 'Jim'}]}))
+        data_exporter.export_data.assert_called_once_with({fc.FILE_NAME: 'file name', fc.RECORDS: [{'name': 'Jim'}]})
+        async_exporter.close()
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = self.read_chunked_body()
+        else:
+            body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == fc.GZIP:
+            body = gzip.decompress(body)
+        self.server.received.append((self.client_address, dict(self.headers), body))
+
+        response = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def read_chunked_body(self):
+        body = b''
+        chunk_size = int(self.rfile.readline().strip(), 16)
+        while chunk_size:
+            body += self.rfile.read(chunk_size)
+            self.rfile.readline()
+            chunk_size = int(self.rfile.readline().strip(), 16)
+        self.rfile.readline()
+        return body
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ApiSenderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.received = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f'http://127.0.0.1:{self.server.server_port}/person'
+        self.session = get_api_session(2)
+        self.data = {fc.FILE_NAME: 'Valid.csv', fc.RECORDS: [{'name': 'Jim'}]}
+
+    def test_send_data_to_api_reuses_connection(self):
+        self.assertEqual({'status': 'ok'}, send_data_to_api(self.data, {}, self.api_url, self.session))
+        send_data_to_api(self.data, {}, self.api_url, self.session)
+        self.assertEqual(self.server.received[0][0], self.server.received[1][0])
+        self.assertEqual(self.data, json.loads(self.server.received[0][2]))
+
+    def test_send_data_to_api_given_compact_records(self):
+        record_class = create_record_class(['name'])
+        send_data_to_api({fc.FILE_NAME: 'Valid.csv', fc.RECORDS: [record_class(['Jim'])]}, {}, self.api_url,
+                         self.session)
+        self.assertEqual(self.data, json.loads(self.server.received[0][2]))
+
+    def test_send_data_to_api_given_gzip_compression(self):
+        send_data_to_api(self.data, {'api-key': 'key'}, self.api_url, self.session, fc.GZIP)
+        _, headers, body = self.server.received[0]
+        self.assertEqual(fc.GZIP, headers['Content-Encoding'])
+        self.assertEqual('key', headers['api-key'])
+        self.assertEqual(self.data, json.loads(body))
+
+    def test_stream_data_to_api_sends_ndjson(self):
+        records = ({'name': f'name {i}'} for i in range(5000))
+        stream_data_to_api(records, {}, self.api_url, self.session, fc.GZIP)
+        _, headers, body = self.server.received[0]
+        self.assertEqual('chunked', headers['Transfer-Encoding'])
+        self.assertEqual('application/x-ndjson', headers['Content-Type'])
+        self.assertEqual([{'name': f'name {i}'} for i in range(5000)],
+                         [json.loads(line) for line in body.splitlines()])
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
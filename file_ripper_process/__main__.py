@@ -1,11 +1,20 @@
+import argparse
 import json
+import os
 import sys
 import unittest
+from functools import partial
 from time import sleep
 
 import requests
 
-from .process import execute_process
+import filemetrics
+from .checkpoint import CheckpointJournal
+from .dedup import ContentDigestIndex
+from .process import execute_process, process_file, process_file_definition, read_file_definitions, \
+    watch_file_definitions
+from .profiling import StackSampler, profile_definitions
+from .registry import DefinitionRegistry
 
 
 class OhGnarlyIntegrationTests(unittest.TestCase):
@@ -20,13 +29,84 @@ class OhGnarlyIntegrationTests(unittest.TestCase):
         self.assertEqual('djmurtle', darin['userName'])
 
 
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(prog='python -m file_ripper_process')
+    parser.add_argument('definitions_file', nargs='?', help='file definitions json file')
+    parser.add_argument('--watch', action='store_true',
+                        help='watch input directories and process files as soon as they are written')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='process files from all definitions concurrently on this many worker threads')
+    parser.add_argument('--checkpoint-file',
+                        help='sqlite journal of exported batches used to resume partially exported files')
+    parser.add_argument('--digest-index',
+                        help='sqlite index of processed file digests used to skip duplicate files')
+    parser.add_argument('--metrics-port', type=int,
+                        help='serve prometheus text metrics on this port')
+    parser.add_argument('--metrics-file',
+                        help='periodically dump metrics as json to this file')
+    parser.add_argument('--metrics-interval', type=float, default=filemetrics.DEFAULT_DUMP_INTERVAL,
+                        help='seconds between json metrics dumps')
+    parser.add_argument('--profile', metavar='DIRECTORY',
+                        help='profile a single cycle and write pstats and collapsed stacks per definition')
+    parser.add_argument('--profile-sample', metavar='DIRECTORY',
+                        help='sample stacks while running and write collapsed stacks after every cycle')
+    return parser.parse_args(args)
+
+
+def start_metrics_sinks(arguments):
+    if arguments.metrics_port is None and not arguments.metrics_file:
+        return []
+    registry = filemetrics.enable_metrics()
+    sinks = []
+    if arguments.metrics_port is not None:
+        sinks.append(filemetrics.PrometheusSink(registry, arguments.metrics_port).start())
+    if arguments.metrics_file:
+        sinks.append(filemetrics.JsonFileSink(registry, arguments.metrics_file, arguments.metrics_interval).start())
+    return sinks
+
+
+def write_sampled_profile(sampler, output_directory):
+    os.makedirs(output_directory, exist_ok=True)
+    sampler.write_collapsed(os.path.join(output_directory, 'sampled.collapsed'))
+    print(sampler.format_summary())
+
+
 if __name__ == "__main__":
+    arguments = parse_arguments(sys.argv[1:])
+    if arguments.definitions_file is None:
+        print('No definitions file provided at command line. Running unit tests.....')
+        unittest.main(argv=sys.argv[:1])
+    checkpoint_journal = CheckpointJournal(arguments.checkpoint_file) if arguments.checkpoint_file else None
+    digest_index = ContentDigestIndex(arguments.digest_index) if arguments.digest_index else None
+    metrics_sinks = start_metrics_sinks(arguments)
+    sampler = StackSampler().start() if arguments.profile_sample else None
     try:
-        while True:
-            execute_process(sys.argv[1])
-            sleep(5 * 60)
+        if arguments.profile:
+            profile_definitions(read_file_definitions(arguments.definitions_file), arguments.profile,
+                                partial(process_file_definition, checkpoint_journal=checkpoint_journal,
+                                        digest_index=digest_index))
+        elif arguments.watch:
+            watch_file_definitions(read_file_definitions(arguments.definitions_file),
+                                   file_processor=partial(process_file, checkpoint_journal=checkpoint_journal,
+                                                          digest_index=digest_index))
+        else:
+            definition_registry = DefinitionRegistry(arguments.definitions_file)
+            while True:
+                execute_process(arguments.definitions_file, workers=arguments.workers,
+                                checkpoint_journal=checkpoint_journal, digest_index=digest_index,
+                                definition_registry=definition_registry)
+                if sampler is not None:
+                    write_sampled_profile(sampler, arguments.profile_sample)
+                sleep(5 * 60)
     except KeyboardInterrupt:
         print('Stopping file_ripper....')
-    except IndexError:
-        print('No definitions file provided at command line. Running unit tests.....')
-        unittest.main()
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            write_sampled_profile(sampler, arguments.profile_sample)
+        if checkpoint_journal:
+            checkpoint_journal.close()
+        if digest_index is not None:
+            digest_index.close()
+        for metrics_sink in metrics_sinks:
+            metrics_sink.close()
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import threading
+from itertools import chain, islice
+
+
+DEFAULT_CHECKPOINT_FILE = 'file_ripper_checkpoints.db'
+
+
+class CheckpointJournal:
+    def __init__(self, journal_path=DEFAULT_CHECKPOINT_FILE):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(journal_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS checkpoints ('
+                                'file_path TEXT PRIMARY KEY, file_size INTEGER NOT NULL, '
+                                'modified_ns INTEGER NOT NULL, records_exported INTEGER NOT NULL)')
+
+    @staticmethod
+    def file_identity(file_path):
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+    def get_records_exported(self, file_path):
+        file_path, file_size, modified_ns = self.file_identity(file_path)
+        with self.lock:
+            row = self.connection.execute('SELECT file_size, modified_ns, records_exported FROM checkpoints '
+                                          'WHERE file_path = ?', (file_path,)).fetchone()
+        if row is None or row[:2] != (file_size, modified_ns):
+            return 0
+        return row[2]
+
+    def save(self, file_path, records_exported):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)',
+                                    (*self.file_identity(file_path), records_exported))
+
+    def clear(self, file_path):
+        with self.lock:
+            self.connection.execute('DELETE FROM checkpoints WHERE file_path = ?', (os.path.abspath(file_path),))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FileCheckpoint:
+    def __init__(self, journal: CheckpointJournal, file_path):
+        self.journal = journal
+        self.file_path = file_path
+        self.records_exported = journal.get_records_exported(file_path)
+
+    def resume(self, records):
+        if not self.records_exported:
+            return records
+        records = islice(records, self.records_exported, None)
+        first_record = next(records, None)
+        return None if first_record is None else chain([first_record], records)
+
+    def batch_exported(self, record_count):
+        self.records_exported += record_count
+        self.journal.save(self.file_path, self.records_exported)
+
+    def complete(self):
+        self.journal.clear(self.file_path)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_DIGEST_INDEX_FILE = 'file_ripper_digests.db'
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+DIGEST_READ_SIZE = 1024 * 1024
+
+
+def compute_file_digest(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(DIGEST_READ_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentDigestIndex:
+    def __init__(self, index_path=DEFAULT_DIGEST_INDEX_FILE, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(index_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS digests ('
+                                'scope TEXT NOT NULL, digest TEXT NOT NULL, file_name TEXT NOT NULL, '
+                                'processed_at REAL NOT NULL, PRIMARY KEY (scope, digest))')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS digests_processed_at ON digests (processed_at)')
+
+    def find(self, scope, digest):
+        with self.lock:
+            row = self.connection.execute('SELECT file_name FROM digests WHERE scope = ? AND digest = ? '
+                                          'AND processed_at >= ?',
+                                          (scope, digest, self.expiry_time())).fetchone()
+        return row[0] if row else None
+
+    def add(self, scope, digest, file_name):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)',
+                                    (scope, digest, file_name, self.clock()))
+            self.evict()
+
+    def evict(self):
+        self.connection.execute('DELETE FROM digests WHERE processed_at < ?', (self.expiry_time(),))
+        if self.max_entries:
+            self.connection.execute('DELETE FROM digests WHERE rowid IN (SELECT rowid FROM digests '
+                                    'ORDER BY processed_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def expiry_time(self):
+        return self.clock() - self.ttl_seconds if self.ttl_seconds else float('-inf')
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM digests').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FileDigest:
+    def __init__(self, digest_index: ContentDigestIndex, scope, file_path):
+        self.digest_index = digest_index
+        self.scope = scope
+        self.file_name = os.path.basename(file_path)
+        self.digest = compute_file_digest(file_path)
+
+    def find_duplicate(self):
+        return self.digest_index.find(self.scope, self.digest)
+
+    def complete(self):
+        self.digest_index.add(self.scope, self.digest, self.file_name)
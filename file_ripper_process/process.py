@@ -1,39 +1,350 @@
+import asyncio
 import json
 import os
+import time
+from collections import deque
+from contextlib import closing
 from datetime import datetime
-from glob import glob
+from fnmatch import fnmatch
+from functools import partial
+from glob import escape, glob
 
-from file_ripper_data.dataexport import create_data_exporter
-from file_ripper.filedefinition import create_file_definitions, FileDefinition
+import file_ripper.fileconstants as fc
+import filemetrics
+from file_ripper_data.asyncexport import create_async_data_exporter
+from file_ripper_data.dataexport import begin_file_export, commit_data_exporter, create_data_exporter, \
+    defer_until_committed, discard_file_export
+from file_ripper.filedefinition import create_file_definitions, FileDefinition, ExportDefinition
 from file_ripper.filelogger import create_file_ripper_logger
-from file_ripper.fileservice import create_file_service
+from file_ripper.fileopener import COMPRESSION_EXTENSIONS, strip_compression_extension
+from file_ripper.fileservice import FileService
+from file_ripper_process.checkpoint import FileCheckpoint
+from file_ripper_process.dedup import FileDigest
+from file_ripper_process.watcher import create_directory_watcher
 
 
 logger = create_file_ripper_logger()
 
+WATCH_POLL_SECONDS = 0.5
+
 
 def move_file_to_completed(file_def: FileDefinition, file_name: str) -> None:
     source = os.path.join(file_def.input_directory, file_name)
     destination = os.path.join(file_def.completed_directory, file_name)
-    if not os.path.exists(file_def.completed_directory):
-        os.mkdir(file_def.completed_directory)
-    os.rename(source, destination)
+    with filemetrics.metrics.time('stage_seconds', stage='move', definition=file_def.file_mask):
+        if not os.path.exists(file_def.completed_directory):
+            os.mkdir(file_def.completed_directory)
+        os.rename(source, destination)
+
+
+def list_input_files(file_definition: FileDefinition):
+    input_directory = os.path.abspath(file_definition.input_directory)
+    file_masks = [file_definition.file_mask, *(file_definition.file_mask + extension
+                                               for extension in COMPRESSION_EXTENSIONS)]
+    file_paths = {file_path for file_mask in file_masks
+                  for file_path in glob(os.path.join(escape(input_directory), file_mask))}
+    return sorted(os.path.basename(file_path) for file_path in file_paths if os.path.isfile(file_path))
+
+
+def matches_file_mask(file_name: str, file_mask: str) -> bool:
+    return fnmatch(file_name, file_mask) or fnmatch(strip_compression_extension(file_name), file_mask)
+
+
+def find_duplicate_file(file_definition: FileDefinition, file_path: str, digest_index, file_mover):
+    if digest_index is None:
+        return None, False
+    scope = os.path.join(os.path.abspath(file_definition.input_directory), file_definition.file_mask)
+    file_digest = FileDigest(digest_index, scope, file_path)
+    original_file_name = file_digest.find_duplicate()
+    if original_file_name is None:
+        return file_digest, False
+
+    logger.info(f'Skipping file {file_digest.file_name}, duplicate content of {original_file_name}')
+    file_mover(file_definition, file_digest.file_name)
+    return file_digest, True
+
+
+def estimate_record_size(record: dict) -> int:
+    return sum(len(str(key)) + len(str(value)) + 6 for key, value in record.items()) + 2
+
+
+def create_record_batches(records, batch_size=0, max_batch_bytes=0):
+    batch = []
+    batch_bytes = 0
+    for record in records:
+        record_bytes = estimate_record_size(record) if max_batch_bytes else 0
+        if batch and max_batch_bytes and batch_bytes + record_bytes > max_batch_bytes:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append(record)
+        batch_bytes += record_bytes
+        if batch_size and len(batch) >= batch_size:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+    if batch or not (batch_size or max_batch_bytes):
+        yield batch
+
+
+def time_record_batches(batches, definition_name: str):
+    metrics = filemetrics.metrics
+    while True:
+        started = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            return
+        metrics.observe('stage_seconds', time.perf_counter() - started, stage='parse', definition=definition_name)
+        metrics.increment('records_total', len(batch), definition=definition_name)
+        yield batch
+
+
+def create_export_batches(records, export_definition: ExportDefinition, definition_name: str):
+    batches = create_record_batches(records, export_definition.batch_size, export_definition.max_batch_bytes)
+    return time_record_batches(batches, definition_name) if filemetrics.metrics.enabled else batches
+
+
+def export_file_records(data_sender, file_name: str, records, export_definition: ExportDefinition,
+                        on_batch_exported=None, definition_name: str = '') -> None:
+    if export_definition.stream_records:
+        with filemetrics.metrics.time('stage_seconds', stage='stream', definition=definition_name):
+            data_sender.export_stream(file_name, records)
+        return
+
+    for batch in create_export_batches(records, export_definition, definition_name):
+        with filemetrics.metrics.time('stage_seconds', stage='export', definition=definition_name):
+            data_sender.export_data({fc.FILE_NAME: file_name, fc.RECORDS: batch})
+        if on_batch_exported:
+            on_batch_exported(len(batch))
+
+
+async def export_file_records_async(async_exporter, file_name: str, records, export_definition: ExportDefinition,
+                                    on_batch_exported=None, definition_name: str = '', in_flight=None) -> None:
+    loop = asyncio.get_running_loop()
+    pipeline_depth = max(export_definition.max_in_flight, 1)
+    in_flight = in_flight if in_flight is not None else asyncio.Semaphore(pipeline_depth)
+    batches = create_export_batches(records, export_definition, definition_name)
+    pending = deque()
+
+    async def export_batch(batch):
+        with filemetrics.metrics.time('stage_seconds', stage='export', definition=definition_name):
+            await async_exporter.export_data({fc.FILE_NAME: file_name, fc.RECORDS: batch})
+
+    async def complete_oldest_batch():
+        export_task, batch_size = pending.popleft()
+        await export_task
+        if on_batch_exported:
+            on_batch_exported(batch_size)
 
+    try:
+        # batches are parsed off the event loop and sent concurrently, but acknowledged in file order
+        while True:
+            batch = await loop.run_in_executor(None, next, batches, None)
+            if batch is None:
+                break
+            if len(pending) >= pipeline_depth:
+                await complete_oldest_batch()
+            await in_flight.acquire()
+            export_task = asyncio.ensure_future(export_batch(batch))
+            export_task.add_done_callback(lambda _: in_flight.release())
+            pending.append((export_task, len(batch)))
+        while pending:
+            await complete_oldest_batch()
+    finally:
+        for export_task, _ in pending:
+            export_task.cancel()
+        await asyncio.gather(*(export_task for export_task, _ in pending), return_exceptions=True)
 
-def process_file_definition(file_definition, data_exporter_factory=create_data_exporter, file_mover=move_file_to_completed):
-    file_service = create_file_service(file_definition)
-    os.chdir(file_definition.input_directory)
+
+def record_file_processed(file_definition: FileDefinition, file_size: int, started: float) -> None:
+    metrics = filemetrics.metrics
+    metrics.observe('stage_seconds', time.perf_counter() - started, stage='file', definition=file_definition.file_mask)
+    metrics.increment('files_total', definition=file_definition.file_mask)
+    metrics.increment('bytes_total', file_size, definition=file_definition.file_mask)
+
+
+async def process_file_definition_async(file_definition, async_exporter_factory=create_async_data_exporter,
+                                        file_mover=move_file_to_completed, checkpoint_journal=None, digest_index=None,
+                                        file_service_factory=FileService.create_file_service):
+    export_definition = file_definition.export_definition
+    file_service = file_service_factory(file_definition)
+    async_exporter = async_exporter_factory(export_definition)
+    open_files = asyncio.Semaphore(export_definition.max_in_flight)
+    in_flight = asyncio.Semaphore(export_definition.max_in_flight)
+    loop = asyncio.get_running_loop()
+
+    async def process_file(file_name):
+        async with open_files:
+            started = time.perf_counter()
+            logger.info(f'Processing file {file_name}...')
+            file_path = os.path.join(file_definition.input_directory, file_name)
+            file_digest, is_duplicate = await loop.run_in_executor(None, find_duplicate_file, file_definition,
+                                                                   file_path, digest_index, file_mover)
+            if is_duplicate:
+                return
+            checkpoint = FileCheckpoint(checkpoint_journal, file_path) if checkpoint_journal else None
+            file_size = os.path.getsize(file_path)
+            with closing(file_service.iter_path_records(file_path)) as file_records:
+                records = await loop.run_in_executor(None, checkpoint.resume, file_records) if checkpoint \
+                    else file_records
+                if records is not None:
+                    await export_file_records_async(async_exporter, file_name, records, export_definition,
+                                                    checkpoint.batch_exported if checkpoint else None,
+                                                    file_definition.file_mask, in_flight)
+            await loop.run_in_executor(None, complete_file, file_definition, file_name, file_mover, checkpoint,
+                                       file_digest)
+            if filemetrics.metrics.enabled:
+                record_file_processed(file_definition, file_size, started)
+
+    file_names = list_input_files(file_definition)
+    try:
+        results = await asyncio.gather(*[process_file(file_name) for file_name in file_names],
+                                       return_exceptions=True)
+    finally:
+        async_exporter.close()
+
+    errors = [(file_name, result) for file_name, result in zip(file_names, results) if isinstance(result, Exception)]
+    for file_name, error in errors:
+        filemetrics.metrics.increment('errors_total', definition=file_definition.file_mask)
+        logger.error(f'Failed to process file {file_name}: {error}')
+    if errors:
+        raise errors[0][1]
+
+
+def process_file_definition(file_definition, data_exporter_factory=create_data_exporter, file_mover=move_file_to_completed,
+                            checkpoint_journal=None, digest_index=None,
+                            file_service_factory=FileService.create_file_service):
+    export_definition = file_definition.export_definition
+    if export_definition.max_in_flight > 1 and not export_definition.stream_records \
+            and export_definition.export_type != fc.FILE_EXPORT:
+        async_exporter_factory = partial(create_async_data_exporter, data_exporter_factory=data_exporter_factory)
+        return asyncio.run(process_file_definition_async(file_definition, async_exporter_factory, file_mover,
+                                                         checkpoint_journal, digest_index, file_service_factory))
+
+    file_service = file_service_factory(file_definition)
     data_sender = data_exporter_factory(file_definition.export_definition)
-    for file_name in glob(file_definition.file_mask):
-        logger.info(f'Processing file {file_name}...')
-        with open(file_name, 'r') as file:
-            data_sender.export_data(file_service.process(file))
-            file_mover(file_definition, file_name)
+    try:
+        with filemetrics.metrics.time('stage_seconds', stage='definition', definition=file_definition.file_mask):
+            for file_name in list_input_files(file_definition):
+                process_file(file_definition, file_name, file_service, data_sender, file_mover, checkpoint_journal,
+                             digest_index)
+    finally:
+        commit_data_exporter(data_sender)
 
 
-def execute_process(definitions_file, file_def_processor=process_file_definition):
-    logger.info(f"Starting file-ripper at {datetime.now().isoformat(' ', timespec='milliseconds')}")
+def process_file(file_definition, file_name, file_service, data_sender, file_mover=move_file_to_completed,
+                 checkpoint_journal=None, digest_index=None):
+    started = time.perf_counter()
+    try:
+        file_size = export_file(file_definition, file_name, file_service, data_sender, file_mover,
+                                checkpoint_journal, digest_index)
+    except Exception:
+        filemetrics.metrics.increment('errors_total', definition=file_definition.file_mask)
+        raise
+    if filemetrics.metrics.enabled:
+        record_file_processed(file_definition, file_size, started)
+
+
+def export_file(file_definition, file_name, file_service, data_sender, file_mover, checkpoint_journal, digest_index):
+    logger.info(f'Processing file {file_name}...')
+    file_path = os.path.join(file_definition.input_directory, file_name)
+    file_digest, is_duplicate = find_duplicate_file(file_definition, file_path, digest_index, file_mover)
+    if is_duplicate:
+        return 0
+    # streamed exports go out as a single request and file exports only land when the output is committed,
+    # so neither has a batch boundary to resume from
+    export_definition = file_definition.export_definition
+    checkpoint = FileCheckpoint(checkpoint_journal, file_path) \
+        if checkpoint_journal and not export_definition.stream_records \
+        and export_definition.export_type != fc.FILE_EXPORT else None
+    file_size = os.path.getsize(file_path)
+    begin_file_export(data_sender, file_name)
+    try:
+        with closing(file_service.iter_path_records(file_path)) as file_records:
+            records = checkpoint.resume(file_records) if checkpoint else file_records
+            if records is not None:
+                if checkpoint and checkpoint.records_exported:
+                    logger.info(f'Resuming file {file_name} after {checkpoint.records_exported} exported records...')
+                export_file_records(data_sender, file_name, records, export_definition,
+                                    checkpoint.batch_exported if checkpoint else None, file_definition.file_mask)
+    except BaseException:
+        discard_file_export(data_sender, file_name)
+        raise
+    defer_until_committed(data_sender, file_name, partial(complete_file, file_definition, file_name, file_mover,
+                                                          checkpoint, file_digest))
+    return file_size
+
+
+def complete_file(file_definition, file_name, file_mover, checkpoint, file_digest):
+    file_mover(file_definition, file_name)
+    if checkpoint:
+        checkpoint.complete()
+    if file_digest is not None:
+        file_digest.complete()
+
+
+def read_file_definitions(definitions_file):
     with open(definitions_file, 'r') as file:
-        file_definitions = create_file_definitions(json.loads(file.read()))
-        for file_def in file_definitions:
-            file_def_processor(file_def)
+        return create_file_definitions(json.loads(file.read()))
+
+
+def execute_process(definitions_file, file_def_processor=process_file_definition, workers=0, checkpoint_journal=None,
+                    digest_index=None, definition_registry=None):
+    logger.info(f"Starting file-ripper at {datetime.now().isoformat(' ', timespec='milliseconds')}")
+    if definition_registry is None:
+        file_definitions = read_file_definitions(definitions_file)
+        factories = {}
+    else:
+        definition_set = definition_registry.get_definition_set()
+        file_definitions = definition_set.file_definitions
+        factories = {'data_exporter_factory': definition_set.create_data_exporter,
+                     'file_service_factory': definition_set.create_file_service}
+
+    if workers:
+        from file_ripper_process.scheduler import DefinitionScheduler
+        file_processor = partial(process_file, checkpoint_journal=checkpoint_journal, digest_index=digest_index)
+        return DefinitionScheduler(workers, file_processor=file_processor, **factories).run(file_definitions)
+
+    if checkpoint_journal:
+        file_def_processor = partial(file_def_processor, checkpoint_journal=checkpoint_journal)
+    if digest_index is not None:
+        file_def_processor = partial(file_def_processor, digest_index=digest_index)
+    if factories:
+        file_def_processor = partial(file_def_processor, **factories)
+
+    for file_def in file_definitions:
+        file_def_processor(file_def)
+
+
+def watch_file_definitions(file_definitions, stop_event=None, watcher_factory=create_directory_watcher,
+                           data_exporter_factory=create_data_exporter, file_processor=process_file,
+                           poll_timeout=WATCH_POLL_SECONDS):
+    file_plans = {}
+    for file_definition in file_definitions:
+        file_plans.setdefault(os.path.abspath(file_definition.input_directory), []).append(
+            (file_definition, FileService.create_file_service(file_definition),
+             data_exporter_factory(file_definition.export_definition)))
+
+    logger.info(f'Watching {len(file_plans)} input directories for new files...')
+    watcher = watcher_factory(list(file_plans))
+    try:
+        while stop_event is None or not stop_event.is_set():
+            data_senders = []
+            for file_path in watcher.poll(poll_timeout):
+                directory, file_name = os.path.split(file_path)
+                for file_definition, file_service, data_sender in file_plans.get(directory, []):
+                    if not matches_file_mask(file_name, file_definition.file_mask):
+                        continue
+                    data_senders.append(data_sender)
+                    try:
+                        file_processor(file_definition, file_name, file_service, data_sender)
+                    except Exception as ex:
+                        logger.error(f'Failed to process file {file_path}: {ex}')
+                        watcher.retry(file_path)
+                    break
+            for data_sender in data_senders:
+                commit_data_exporter(data_sender)
+    finally:
+        watcher.close()
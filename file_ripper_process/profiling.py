@@ -0,0 +1,132 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter
+
+from file_ripper.filelogger import create_file_ripper_logger
+
+
+logger = create_file_ripper_logger()
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_SUMMARY_LIMIT = 15
+FILE_RIPPER_PACKAGES = ('file_ripper', 'file_ripper_data', 'file_ripper_process')
+
+
+def get_frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{getattr(code, "co_qualname", code.co_name)}'
+
+
+def is_file_ripper_frame(file_name: str) -> bool:
+    return os.path.basename(os.path.dirname(file_name)) in FILE_RIPPER_PACKAGES
+
+
+class StackSampler:
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='file-ripper-sampler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def run(self):
+        sampler_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            self.sample(sampler_id)
+
+    def sample(self, sampler_id=None):
+        samples = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append((get_frame_label(frame), frame.f_code.co_filename))
+                frame = frame.f_back
+            samples.append(tuple(reversed(stack)))
+        with self.lock:
+            self.stacks.update(samples)
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+
+    def collapsed_lines(self):
+        with self.lock:
+            stacks = list(self.stacks.items())
+        return [f'{";".join(label for label, _ in stack)} {count}' for stack, count in sorted(stacks)]
+
+    def write_collapsed(self, file_path):
+        with open(file_path, 'w') as file:
+            file.writelines(f'{line}\n' for line in self.collapsed_lines())
+
+    def hottest_functions(self, limit=DEFAULT_SUMMARY_LIMIT):
+        own_samples = Counter()
+        total_samples = Counter()
+        with self.lock:
+            stacks = list(self.stacks.items())
+        sample_count = sum(count for _, count in stacks)
+        for stack, count in stacks:
+            file_ripper_frames = [label for label, file_name in stack if is_file_ripper_frame(file_name)]
+            if not file_ripper_frames:
+                continue
+            own_samples[file_ripper_frames[-1]] += count
+            for label in set(file_ripper_frames):
+                total_samples[label] += count
+        ranked = sorted(total_samples, key=lambda label: (-own_samples[label], -total_samples[label]))[:limit]
+        return [(label, own_samples[label], total_samples[label], total_samples[label] / sample_count)
+                for label in ranked]
+
+    def format_summary(self, limit=DEFAULT_SUMMARY_LIMIT):
+        lines = [f'{"own":>7} {"total":>7} {"share":>6}  function']
+        lines.extend(f'{own:>7} {total:>7} {share:>6.1%}  {label}'
+                     for label, own, total, share in self.hottest_functions(limit))
+        return '\n'.join(lines)
+
+
+def get_profile_file_name(file_definition) -> str:
+    name = file_definition.file_description or file_definition.file_mask
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'definition'
+
+
+def profile_definitions(file_definitions, output_directory, definition_processor,
+                        sample_interval=DEFAULT_SAMPLE_INTERVAL):
+    os.makedirs(output_directory, exist_ok=True)
+    output_files = []
+    for index, file_definition in enumerate(file_definitions):
+        file_name = os.path.join(output_directory, f'{index:02d}-{get_profile_file_name(file_definition)}')
+        profiler = cProfile.Profile()
+        sampler = StackSampler(sample_interval)
+        with sampler:
+            profiler.enable()
+            try:
+                definition_processor(file_definition)
+            finally:
+                profiler.disable()
+        profiler.dump_stats(f'{file_name}.pstats')
+        sampler.write_collapsed(f'{file_name}.collapsed')
+        logger.info(f'Profiled {file_definition.file_mask} to {file_name}.pstats\n{sampler.format_summary()}')
+        output_files.append(file_name)
+    return output_files
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+
+from file_ripper_data.dataexport import create_data_exporter
+from file_ripper.filedefinition import create_file_definitions
+from file_ripper.filelogger import create_file_ripper_logger
+from file_ripper.fileservice import FileService
+
+
+logger = create_file_ripper_logger()
+
+
+class CompiledDefinition:
+    def __init__(self, file_definition, file_service, data_sender):
+        self.file_definition = file_definition
+        self.file_service = file_service
+        self.data_sender = data_sender
+
+
+class DefinitionSet:
+    def __init__(self, compiled_definitions, digest=''):
+        self.compiled_definitions = tuple(compiled_definitions)
+        self.digest = digest
+        self.file_services = {id(plan.file_definition): plan.file_service for plan in self.compiled_definitions}
+        self.data_senders = {id(plan.file_definition.export_definition): plan.data_sender
+                             for plan in self.compiled_definitions}
+
+    @property
+    def file_definitions(self):
+        return [plan.file_definition for plan in self.compiled_definitions]
+
+    def create_file_service(self, file_definition):
+        return self.file_services[id(file_definition)]
+
+    def create_data_exporter(self, export_definition):
+        return self.data_senders[id(export_definition)]
+
+    def __iter__(self):
+        return iter(self.compiled_definitions)
+
+    def __len__(self):
+        return len(self.compiled_definitions)
+
+
+class DefinitionRegistry:
+    def __init__(self, definitions_file, data_exporter_factory=create_data_exporter,
+                 file_service_factory=FileService.create_file_service):
+        self.definitions_file = definitions_file
+        self.data_exporter_factory = data_exporter_factory
+        self.file_service_factory = file_service_factory
+        self.lock = threading.Lock()
+        self.file_stamp = None
+        self.definition_set = None
+
+    def get_definition_set(self) -> DefinitionSet:
+        with self.lock:
+            stat = os.stat(self.definitions_file)
+            file_stamp = (stat.st_mtime_ns, stat.st_size)
+            if file_stamp != self.file_stamp:
+                self.reload(file_stamp)
+            return self.definition_set
+
+    def reload(self, file_stamp):
+        with open(self.definitions_file, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if self.definition_set is not None and digest == self.definition_set.digest:
+            self.file_stamp = file_stamp
+            return
+
+        try:
+            definition_set = self.compile(json.loads(content), digest)
+        except Exception as ex:
+            if self.definition_set is None:
+                raise
+            logger.error(f'Failed to reload {self.definitions_file}, keeping previous definitions: {ex}')
+            self.file_stamp = file_stamp
+            return
+
+        logger.info(f'Loaded {len(definition_set)} file definitions from {self.definitions_file}')
+        self.definition_set = definition_set
+        self.file_stamp = file_stamp
+
+    def compile(self, definitions_data, digest):
+        return DefinitionSet([CompiledDefinition(file_definition,
+                                                 self.file_service_factory(file_definition).compile(),
+                                                 self.data_exporter_factory(file_definition.export_definition))
+                              for file_definition in create_file_definitions(definitions_data)], digest)
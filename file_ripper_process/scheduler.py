@@ -0,0 +1,77 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from file_ripper_data.dataexport import commit_data_exporter, create_data_exporter
+from file_ripper.fileservice import FileService
+from file_ripper_process.process import list_input_files, logger, move_file_to_completed, process_file
+
+
+DEFAULT_WORKERS = 4
+
+
+class DefinitionQueue:
+    def __init__(self, file_definition, file_service, data_sender, file_names):
+        self.file_definition = file_definition
+        self.file_service = file_service
+        self.data_sender = data_sender
+        self.file_names = deque(file_names)
+        self.in_flight = 0
+
+    def has_capacity(self):
+        return bool(self.file_names) and self.in_flight < self.file_definition.max_concurrency
+
+
+class DefinitionScheduler:
+    def __init__(self, workers=DEFAULT_WORKERS, data_exporter_factory=create_data_exporter,
+                 file_mover=move_file_to_completed, file_processor=process_file,
+                 file_service_factory=FileService.create_file_service):
+        self.workers = workers
+        self.data_exporter_factory = data_exporter_factory
+        self.file_service_factory = file_service_factory
+        self.file_mover = file_mover
+        self.file_processor = file_processor
+
+    def create_queues(self, file_definitions):
+        return deque(DefinitionQueue(file_definition, self.file_service_factory(file_definition),
+                                     self.data_exporter_factory(file_definition.export_definition),
+                                     list_input_files(file_definition))
+                     for file_definition in file_definitions)
+
+    def run(self, file_definitions):
+        queues = self.create_queues(file_definitions)
+        running = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                self.dispatch(executor, queues, running)
+                if not running:
+                    for queue in queues:
+                        commit_data_exporter(queue.data_sender)
+                    return errors
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    queue, file_name = running.pop(future)
+                    queue.in_flight -= 1
+                    if future.exception() is not None:
+                        logger.error(f'Failed to process file {file_name}: {future.exception()}')
+                        errors.append((file_name, future.exception()))
+
+    def dispatch(self, executor, queues, running):
+        dispatched = True
+        while dispatched and len(running) < self.workers:
+            dispatched = False
+            for _ in range(len(queues)):
+                if len(running) >= self.workers:
+                    break
+                queue = queues[0]
+                queues.rotate(-1)
+                if not queue.has_capacity():
+                    continue
+
+                file_name = queue.file_names.popleft()
+                queue.in_flight += 1
+                future = executor.submit(self.file_processor, queue.file_definition, file_name, queue.file_service,
+                                         queue.data_sender, self.file_mover)
+                running[future] = (queue, file_name)
+                dispatched = True
@@ -1,11 +1,47 @@
+import asyncio
+import gzip
 import json
 import os
+import pstats
+import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock
 
 import file_ripper.fileconstants as fc
+import filemetrics
 from file_ripper.filedefinition import FileDefinition
-from file_ripper_process.process import process_file_definition, execute_process
+from file_ripper.fileservice import FileService
+from file_ripper_process.process import process_file_definition, execute_process, create_record_batches, \
+    process_file_definition_async, process_file, watch_file_definitions, list_input_files, export_file_records_async
+from file_ripper_process.checkpoint import CheckpointJournal
+from file_ripper_data.dataexport import FileExporter
+from file_ripper_process.dedup import ContentDigestIndex, compute_file_digest
+from file_ripper_process.profiling import StackSampler, profile_definitions
+from file_ripper_process.registry import DefinitionRegistry
+from file_ripper_process.scheduler import DefinitionScheduler
+from file_ripper_process.watcher import ScandirWatcher, InotifyWatcher, load_inotify, INOTIFY_EVENT, IN_Q_OVERFLOW
+
+
+class RecordingAsyncExporter:
+    def __init__(self, fail_file=None):
+        self.fail_file = fail_file
+        self.exported = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+
+    async def export_data(self, data):
+        if data[fc.FILE_NAME] == self.fail_file:
+            raise OSError('export failed')
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.exported.setdefault(data[fc.FILE_NAME], []).extend(r['name'] for r in data[fc.RECORDS])
+        self.in_flight -= 1
+
+    def close(self):
+        self.closed = True
 
 
 class FileRipperProcessTests(unittest.TestCase):
@@ -27,6 +63,101 @@ class FileRipperProcessTests(unittest.TestCase):
         data_sender.assert_called_once()
         file_mover.assert_called_once()
 
+    def test_process_file_definition_exports_batches(self):
+        self.json_data[fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = 2
+        with open(self.file_name, 'a') as file:
+            file.write("\nJane,98,01/01/1971\nJohn,97,01/01/1972")
+        file_definition = FileDefinition(self.json_data)
+        data_sender = MagicMock()
+        process_file_definition(file_definition, MagicMock(return_value=data_sender), MagicMock())
+        batches = [c.args[0][fc.RECORDS] for c in data_sender.export_data.call_args_list]
+        self.assertEqual([['Jason', 'Jane'], ['John']], [[r['name'] for r in batch] for batch in batches])
+
+    def test_process_file_definition_streams_records(self):
+        self.json_data[fc.EXPORT_DEFINITION][fc.STREAM_RECORDS] = True
+        file_definition = FileDefinition(self.json_data)
+        data_sender = MagicMock()
+        data_sender.export_stream.side_effect = lambda file_name, records: self.assertEqual(
+            ['Jason'], [record['name'] for record in records])
+        process_file_definition(file_definition, MagicMock(return_value=data_sender), MagicMock())
+        data_sender.export_stream.assert_called_once()
+        data_sender.export_data.assert_not_called()
+
+    def test_process_file_definition_given_max_in_flight_exports_concurrently(self):
+        self.json_data[fc.EXPORT_DEFINITION][fc.MAX_IN_FLIGHT] = 2
+        self.json_data[fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = 1
+        extra_files = self.create_extra_files(3)
+        async_exporter = RecordingAsyncExporter()
+        file_mover = MagicMock()
+        asyncio.run(process_file_definition_async(FileDefinition(self.json_data), lambda _: async_exporter,
+                                                  file_mover))
+        self.assertEqual(2, async_exporter.max_in_flight)
+        self.assertEqual(4, file_mover.call_count)
+        for file_name in extra_files:
+            self.assertEqual(['Jason', 'Jane'], async_exporter.exported[file_name])
+        self.assertTrue(async_exporter.closed)
+
+    def test_export_file_records_async_pipelines_batches_in_file_order(self):
+        export_definition = FileDefinition(self.json_data).export_definition
+        export_definition.max_in_flight = 3
+        export_definition.batch_size = 1
+        exporter = RecordingAsyncExporter()
+        exporter.completed = []
+        parse_threads = set()
+
+        async def export_data(data):
+            name = data[fc.RECORDS][0]['name']
+            exporter.in_flight += 1
+            exporter.max_in_flight = max(exporter.max_in_flight, exporter.in_flight)
+            await asyncio.sleep(0.01 * (3 - int(name) % 3))
+            exporter.completed.append(name)
+            exporter.in_flight -= 1
+
+        def records():
+            for i in range(6):
+                parse_threads.add(threading.get_ident())
+                yield {'name': str(i)}
+
+        exporter.export_data = export_data
+        acknowledged = []
+        asyncio.run(export_file_records_async(exporter, self.file_name, records(), export_definition,
+                                              lambda _: acknowledged.append(set(exporter.completed))))
+        self.assertEqual(3, exporter.max_in_flight)
+        self.assertNotEqual(sorted(exporter.completed), exporter.completed)
+        self.assertEqual(6, len(acknowledged))
+        self.assertTrue(all(str(i) in completed for i, completed in enumerate(acknowledged)))
+        self.assertNotIn(threading.get_ident(), parse_threads)
+
+    def test_process_file_definition_async_continues_after_file_error(self):
+        self.json_data[fc.EXPORT_DEFINITION][fc.MAX_IN_FLIGHT] = 2
+        extra_files = self.create_extra_files(2)
+        async_exporter = RecordingAsyncExporter(fail_file=extra_files[0])
+        file_mover = MagicMock()
+        coroutine = process_file_definition_async(FileDefinition(self.json_data), lambda _: async_exporter, file_mover)
+        self.assertRaises(OSError, asyncio.run, coroutine)
+        self.assertEqual(2, file_mover.call_count)
+
+    def create_extra_files(self, file_count):
+        file_names = [f'Valid-0910201{i}.csv' for i in range(file_count)]
+        for file_name in file_names:
+            with open(file_name, 'w') as file:
+                file.write("Name,Age,DOB\nJason,99,01/01/1970\nJane,98,01/01/1971")
+            self.addCleanup(os.remove, file_name)
+        return file_names
+
+    def test_create_record_batches_given_batch_size(self):
+        records = [{'name': str(i)} for i in range(5)]
+        batches = list(create_record_batches(iter(records), batch_size=2))
+        self.assertEqual([records[0:2], records[2:4], records[4:]], batches)
+
+    def test_create_record_batches_given_max_batch_bytes(self):
+        records = [{'name': 'a' * 10} for _ in range(4)]
+        batches = list(create_record_batches(records, max_batch_bytes=50))
+        self.assertEqual([records[0:2], records[2:4]], batches)
+
+    def test_create_record_batches_unbatched(self):
+        self.assertEqual([[]], list(create_record_batches([])))
+
     def test_execute_process(self):
         file_processor = MagicMock()
         execute_process(self.definitions_file, file_processor)
@@ -66,4 +197,504 @@ class FileRipperProcessTests(unittest.TestCase):
             fc.FILE_DEFINITIONS: [
                 file_def
             ]
-        }
\ No newline at end of file
+        }
+
+
+class DefinitionSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def create_file_definition(self, file_mask, max_concurrency=1):
+        json_data = FileRipperProcessTests.create_file_def_json()
+        json_data[fc.FILE_MASK] = file_mask
+        json_data[fc.INPUT_DIRECTORY] = self.directory.name
+        json_data[fc.MAX_CONCURRENCY] = max_concurrency
+        return FileDefinition(json_data)
+
+    def write_files(self, *file_names):
+        for file_name in file_names:
+            with open(os.path.join(self.directory.name, file_name), 'w') as file:
+                file.write('Name,Age,DOB\nJason,99,01/01/1970')
+
+    def test_list_input_files_does_not_change_directory(self):
+        self.write_files('A-2.csv', 'A-1.csv', 'B-1.csv')
+        working_directory = os.getcwd()
+        self.assertEqual(['A-1.csv', 'A-2.csv'], list_input_files(self.create_file_definition('A-*.csv')))
+        self.assertEqual(working_directory, os.getcwd())
+
+    def test_list_input_files_includes_compressed_files(self):
+        self.write_files('A-1.csv', 'A-2.csv.gz', 'A-3.csv.zip', 'A-4.txt.gz')
+        self.assertEqual(['A-1.csv', 'A-2.csv.gz', 'A-3.csv.zip'],
+                         list_input_files(self.create_file_definition('A-*.csv')))
+
+    def test_process_file_decompresses_input(self):
+        file_path = os.path.join(self.directory.name, 'A-1.csv.gz')
+        with gzip.open(file_path, 'wt') as file:
+            file.write('Name,Age,DOB\nJason,99,01/01/1970')
+        file_definition = self.create_file_definition('A-*.csv')
+        data_sender = MagicMock()
+        process_file(file_definition, 'A-1.csv.gz', FileService.create_file_service(file_definition), data_sender,
+                     MagicMock())
+        self.assertEqual(['Jason'], [record['name'] for record in data_sender.export_data.call_args.args[0][fc.RECORDS]])
+
+    def test_run_interleaves_definitions(self):
+        self.write_files('A-1.csv', 'A-2.csv', 'A-3.csv', 'B-1.csv')
+        processed = []
+        scheduler = DefinitionScheduler(1, MagicMock(), MagicMock(),
+                                        lambda definition, file_name, *args: processed.append(file_name))
+        scheduler.run([self.create_file_definition('A-*.csv'), self.create_file_definition('B-*.csv')])
+        self.assertEqual(['A-1.csv', 'B-1.csv', 'A-2.csv', 'A-3.csv'], processed)
+
+    def test_run_limits_concurrency_per_definition(self):
+        self.write_files('A-1.csv', 'A-2.csv', 'A-3.csv', 'A-4.csv')
+        lock = threading.Lock()
+        counts = {'running': 0, 'peak': 0}
+
+        def file_processor(*args):
+            with lock:
+                counts['running'] += 1
+                counts['peak'] = max(counts['peak'], counts['running'])
+            threading.Event().wait(0.05)
+            with lock:
+                counts['running'] -= 1
+
+        DefinitionScheduler(4, MagicMock(), MagicMock(), file_processor).run(
+            [self.create_file_definition('A-*.csv', max_concurrency=2)])
+        self.assertEqual(2, counts['peak'])
+
+    def test_run_continues_after_file_error(self):
+        self.write_files('A-1.csv', 'A-2.csv')
+        file_processor = MagicMock(side_effect=[OSError('bad file'), None])
+        errors = DefinitionScheduler(1, MagicMock(), MagicMock(), file_processor).run(
+            [self.create_file_definition('A-*.csv')])
+        self.assertEqual(2, file_processor.call_count)
+        self.assertEqual(['A-1.csv'], [file_name for file_name, _ in errors])
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        json_data = FileRipperProcessTests.create_file_def_json()
+        json_data[fc.INPUT_DIRECTORY] = self.directory.name
+        json_data[fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = 2
+        self.file_definition = FileDefinition(json_data)
+        self.file_name = 'Valid-1.csv'
+        self.file_path = os.path.join(self.directory.name, self.file_name)
+        with open(self.file_path, 'w') as file:
+            file.write('Name,Age,DOB\n' + '\n'.join(f'Person{i},{i},01/01/1970' for i in range(5)))
+        self.journal = CheckpointJournal(os.path.join(self.directory.name, 'checkpoints.db'))
+        self.addCleanup(self.journal.close)
+
+    def process_file(self, data_sender, file_mover):
+        process_file(self.file_definition, self.file_name, FileService.create_file_service(self.file_definition),
+                     data_sender, file_mover, self.journal)
+
+    def test_process_file_resumes_after_last_exported_batch(self):
+        data_sender = MagicMock()
+        data_sender.export_data.side_effect = [None, OSError('connection reset')]
+        self.assertRaises(OSError, self.process_file, data_sender, MagicMock())
+        self.assertEqual(2, self.journal.get_records_exported(self.file_path))
+
+        data_sender = MagicMock()
+        file_mover = MagicMock()
+        self.process_file(data_sender, file_mover)
+        batches = [c.args[0][fc.RECORDS] for c in data_sender.export_data.call_args_list]
+        self.assertEqual([['Person2', 'Person3'], ['Person4']], [[r['name'] for r in batch] for batch in batches])
+        file_mover.assert_called_once()
+        self.assertEqual(0, self.journal.get_records_exported(self.file_path))
+
+    def test_process_file_skips_export_when_all_records_exported(self):
+        self.journal.save(self.file_path, 5)
+        data_sender = MagicMock()
+        file_mover = MagicMock()
+        self.process_file(data_sender, file_mover)
+        data_sender.export_data.assert_not_called()
+        file_mover.assert_called_once()
+
+    def test_process_file_given_file_export_moves_file_after_output_is_committed(self):
+        export_definition = self.file_definition.export_definition
+        export_definition.export_type = fc.FILE_EXPORT
+        output_path = os.path.join(self.directory.name, 'output.ndjson')
+        file_exporter = FileExporter(output_path)
+        file_mover = MagicMock(side_effect=lambda *_: self.assertTrue(os.path.exists(output_path)))
+        self.process_file(file_exporter, file_mover)
+        file_mover.assert_not_called()
+        self.assertEqual(0, self.journal.get_records_exported(self.file_path))
+        file_exporter.commit()
+        file_mover.assert_called_once_with(self.file_definition, self.file_name)
+
+    def test_process_file_given_file_export_leaves_failed_file_out_of_output(self):
+        self.file_definition.export_definition.export_type = fc.FILE_EXPORT
+        output_path = os.path.join(self.directory.name, 'output.ndjson')
+        file_exporter = FileExporter(output_path)
+        file_mover = MagicMock()
+        self.process_file(file_exporter, file_mover)
+        with open(os.path.join(self.directory.name, 'Valid-2.csv'), 'w') as file:
+            file.write('Name,Age,DOB\nAnn,1,01/01/1970\nSue,2,01/01/1970\n')
+
+        def iter_path_records(file_path):
+            yield {'name': 'Ann'}
+            yield {'name': 'Sue'}
+            raise ValueError('bad record')
+
+        file_service = MagicMock(iter_path_records=iter_path_records)
+        self.assertRaises(ValueError, process_file, self.file_definition, 'Valid-2.csv', file_service,
+                          file_exporter, file_mover)
+        file_exporter.commit()
+        with open(output_path) as file:
+            self.assertEqual([f'Person{i}' for i in range(5)], [json.loads(line)['name'] for line in file])
+        file_mover.assert_called_once_with(self.file_definition, self.file_name)
+
+    def test_get_records_exported_ignores_changed_file(self):
+        self.journal.save(self.file_path, 2)
+        with open(self.file_path, 'a') as file:
+            file.write('\nPerson5,5,01/01/1970')
+        self.assertEqual(0, self.journal.get_records_exported(self.file_path))
+
+
+class ContentDigestIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        json_data = FileRipperProcessTests.create_file_def_json()
+        json_data[fc.INPUT_DIRECTORY] = self.directory.name
+        self.file_definition = FileDefinition(json_data)
+        self.now = 1000.0
+        self.digest_index = ContentDigestIndex(os.path.join(self.directory.name, 'digests.db'), max_entries=2,
+                                               ttl_seconds=60, clock=lambda: self.now)
+        self.addCleanup(self.digest_index.close)
+
+    def write_file(self, file_name, content='Name,Age,DOB\nJason,99,01/01/1970'):
+        with open(os.path.join(self.directory.name, file_name), 'w') as file:
+            file.write(content)
+
+    def test_process_file_moves_duplicate_without_exporting(self):
+        self.write_file('Valid-1.csv')
+        self.write_file('Valid-2.csv')
+        file_service = FileService.create_file_service(self.file_definition)
+        data_sender = MagicMock()
+        file_mover = MagicMock()
+        for file_name in ['Valid-1.csv', 'Valid-2.csv']:
+            process_file(self.file_definition, file_name, file_service, data_sender, file_mover,
+                         digest_index=self.digest_index)
+        data_sender.export_data.assert_called_once()
+        self.assertEqual(['Valid-1.csv', 'Valid-2.csv'], [c.args[1] for c in file_mover.call_args_list])
+
+    def test_find_expires_entries_after_ttl(self):
+        self.digest_index.add('scope', 'abc', 'Valid-1.csv')
+        self.assertEqual('Valid-1.csv', self.digest_index.find('scope', 'abc'))
+        self.assertIsNone(self.digest_index.find('other', 'abc'))
+        self.now += 61
+        self.assertIsNone(self.digest_index.find('scope', 'abc'))
+
+    def test_add_evicts_oldest_entries(self):
+        for i in range(3):
+            self.now += 1
+            self.digest_index.add('scope', str(i), f'Valid-{i}.csv')
+        self.assertEqual(2, len(self.digest_index))
+        self.assertIsNone(self.digest_index.find('scope', '0'))
+
+    def test_compute_file_digest(self):
+        self.write_file('Valid-1.csv', 'abc')
+        self.assertEqual('ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad',
+                         compute_file_digest(os.path.join(self.directory.name, 'Valid-1.csv')))
+
+
+class DefinitionRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.definitions_file = os.path.join(self.directory.name, 'file_definitions.json')
+        self.json_data = FileRipperProcessTests.create_file_def_json()
+        self.write_definitions(self.json_data)
+        self.data_sender = MagicMock()
+        self.data_exporter_factory = MagicMock(return_value=self.data_sender)
+        self.registry = DefinitionRegistry(self.definitions_file, self.data_exporter_factory)
+
+    def write_definitions(self, json_data, modified_ns=None):
+        with open(self.definitions_file, 'w') as file:
+            file.write(json.dumps(FileRipperProcessTests.create_file_defs_json(json_data)))
+        if modified_ns is not None:
+            os.utime(self.definitions_file, ns=(modified_ns, modified_ns))
+
+    def test_get_definition_set_compiles_once(self):
+        definition_set = self.registry.get_definition_set()
+        self.assertIs(definition_set, self.registry.get_definition_set())
+        self.data_exporter_factory.assert_called_once()
+        file_definition = definition_set.file_definitions[0]
+        self.assertIsNotNone(definition_set.create_file_service(file_definition).decoder)
+        self.assertIs(self.data_sender, definition_set.create_data_exporter(file_definition.export_definition))
+
+    def test_get_definition_set_ignores_touch_without_changes(self):
+        definition_set = self.registry.get_definition_set()
+        self.write_definitions(self.json_data, modified_ns=10 ** 18)
+        self.assertIs(definition_set, self.registry.get_definition_set())
+
+    def test_get_definition_set_reloads_changed_file(self):
+        definition_set = self.registry.get_definition_set()
+        self.json_data[fc.FILE_MASK] = 'Other-*.csv'
+        self.write_definitions(self.json_data, modified_ns=10 ** 18)
+        reloaded = self.registry.get_definition_set()
+        self.assertIsNot(definition_set, reloaded)
+        self.assertEqual('Other-*.csv', reloaded.file_definitions[0].file_mask)
+        self.assertEqual('Valid-*.csv', definition_set.file_definitions[0].file_mask)
+
+    def test_get_definition_set_keeps_previous_definitions_on_invalid_reload(self):
+        definition_set = self.registry.get_definition_set()
+        del self.json_data[fc.FILE_MASK]
+        self.write_definitions(self.json_data, modified_ns=10 ** 18)
+        self.assertIs(definition_set, self.registry.get_definition_set())
+
+    def test_execute_process_uses_compiled_definitions(self):
+        file_def_processor = MagicMock()
+        execute_process(self.definitions_file, file_def_processor, definition_registry=self.registry)
+        definition_set = self.registry.get_definition_set()
+        self.assertIs(definition_set.file_definitions[0], file_def_processor.call_args.args[0])
+        self.assertEqual(definition_set.create_file_service,
+                         file_def_processor.call_args.kwargs['file_service_factory'])
+
+
+class ProcessMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        json_data = FileRipperProcessTests.create_file_def_json()
+        json_data[fc.INPUT_DIRECTORY] = self.directory.name
+        json_data[fc.EXPORT_DEFINITION][fc.BATCH_SIZE] = 1
+        self.file_definition = FileDefinition(json_data)
+        with open(os.path.join(self.directory.name, 'Valid-1.csv'), 'w') as file:
+            file.write('Name,Age,DOB\nJason,99,01/01/1970\nJane,98,01/01/1971')
+        self.registry = filemetrics.enable_metrics()
+        self.addCleanup(filemetrics.disable_metrics)
+
+    def test_process_file_definition_records_stage_metrics(self):
+        process_file_definition(self.file_definition, MagicMock(), MagicMock())
+        metrics = self.registry.to_dict()
+        counters = {counter['name']: counter['value'] for counter in metrics['counters']}
+        self.assertEqual({'records_total': 2, 'files_total': 1, 'bytes_total': 51}, counters)
+        stages = {histogram['labels']['stage']: histogram['count'] for histogram in metrics['histograms']}
+        self.assertEqual({'parse': 2, 'export': 2, 'file': 1, 'definition': 1}, stages)
+
+    def test_process_file_counts_errors(self):
+        data_sender = MagicMock()
+        data_sender.export_data.side_effect = OSError('connection reset')
+        file_service = FileService.create_file_service(self.file_definition)
+        self.assertRaises(OSError, process_file, self.file_definition, 'Valid-1.csv', file_service, data_sender,
+                          MagicMock())
+        self.assertIn({'name': 'errors_total', 'labels': {'definition': 'Valid-*.csv'}, 'value': 1},
+                      self.registry.to_dict()['counters'])
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_sample_records_current_stack(self):
+        sampler = StackSampler(thread_ids={threading.get_ident()})
+
+        def export_batch():
+            sampler.sample()
+
+        export_batch()
+        export_batch()
+        collapsed = sampler.collapsed_lines()
+        self.assertEqual(1, len(collapsed))
+        self.assertTrue(collapsed[0].endswith('test_sample_records_current_stack.<locals>.export_batch;'
+                                              'profiling.py:StackSampler.sample 2'))
+        hottest = {label: (own, total, share) for label, own, total, share in sampler.hottest_functions()}
+        self.assertEqual((2, 2, 1.0), hottest['profiling.py:StackSampler.sample'])
+        self.assertEqual((0, 2, 1.0),
+                         hottest['tests.py:ProfilingTests.test_sample_records_current_stack.<locals>.export_batch'])
+
+    def test_profile_definitions_writes_pstats_and_collapsed_stacks(self):
+        file_definition = FileDefinition(FileRipperProcessTests.create_file_def_json())
+        with tempfile.TemporaryDirectory() as directory:
+            output_files = profile_definitions([file_definition], directory,
+                                               lambda _: threading.Event().wait(0.05), sample_interval=0.001)
+            self.assertEqual([os.path.join(directory, '00-Valid-_.csv')], output_files)
+            self.assertGreater(pstats.Stats(f'{output_files[0]}.pstats').total_calls, 0)
+            with open(f'{output_files[0]}.collapsed') as file:
+                self.assertIn('tests.py:ProfilingTests.test_profile_definitions_writes_pstats_and_collapsed_stacks',
+                              file.read())
+
+
+class FakeWatcher:
+    def __init__(self, batches, stop_event):
+        self.batches = batches
+        self.stop_event = stop_event
+        self.closed = False
+        self.retried = []
+
+    def poll(self, timeout):
+        if not self.batches:
+            self.stop_event.set()
+            return []
+        return self.batches.pop(0)
+
+    def retry(self, file_path):
+        self.retried.append(file_path)
+
+    def close(self):
+        self.closed = True
+
+
+class WatchFileDefinitionsTests(unittest.TestCase):
+    def setUp(self):
+        self.json_data = FileRipperProcessTests.create_file_def_json()
+        self.file_definition = FileDefinition(self.json_data)
+        self.stop_event = threading.Event()
+        self.directory = os.path.abspath(self.file_definition.input_directory)
+
+    def test_watch_file_definitions_dispatches_matching_files(self):
+        watcher = FakeWatcher([[os.path.join(self.directory, 'Valid-1.csv'),
+                                os.path.join(self.directory, 'Other-1.txt')]], self.stop_event)
+        file_processor = MagicMock()
+        watch_file_definitions([self.file_definition], self.stop_event, lambda _: watcher, MagicMock(),
+                               file_processor, poll_timeout=0)
+        file_processor.assert_called_once()
+        self.assertEqual('Valid-1.csv', file_processor.call_args.args[1])
+        self.assertTrue(watcher.closed)
+
+    def test_watch_file_definitions_keeps_running_after_file_error(self):
+        watcher = FakeWatcher([[os.path.join(self.directory, 'Valid-1.csv')],
+                               [os.path.join(self.directory, 'Valid-2.csv')]], self.stop_event)
+        file_processor = MagicMock(side_effect=[OSError('bad file'), None])
+        watch_file_definitions([self.file_definition], self.stop_event, lambda _: watcher, MagicMock(),
+                               file_processor, poll_timeout=0)
+        self.assertEqual(2, file_processor.call_count)
+        self.assertEqual([os.path.join(self.directory, 'Valid-1.csv')], watcher.retried)
+
+    def test_process_file(self):
+        file_name = 'Valid-09112019.csv'
+        with open(file_name, 'w') as file:
+            file.write("Name,Age,DOB\nJason,99,01/01/1970")
+        self.addCleanup(os.remove, file_name)
+        file_service = MagicMock()
+        file_service.iter_path_records.return_value = (record for record in [{'name': 'Jason'}])
+        data_sender = MagicMock()
+        file_mover = MagicMock()
+        process_file(self.file_definition, file_name, file_service, data_sender, file_mover)
+        data_sender.export_data.assert_called_once_with({fc.FILE_NAME: file_name, fc.RECORDS: [{'name': 'Jason'}]})
+        file_mover.assert_called_once_with(self.file_definition, file_name)
+
+
+class ScandirWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.now = 0
+        self.watcher = ScandirWatcher([self.directory.name], settle_seconds=1, clock=lambda: self.now)
+        self.file_path = os.path.join(self.directory.name, 'Valid-1.csv')
+
+    def write_file(self, content):
+        with open(self.file_path, 'a') as file:
+            file.write(content)
+
+    def test_scan_waits_for_size_and_mtime_to_settle(self):
+        self.write_file('Name,Age')
+        self.assertEqual([], self.watcher.scan())
+        self.now = 0.5
+        self.assertEqual([], self.watcher.scan())
+        self.now = 1
+        self.assertEqual([self.file_path], self.watcher.scan())
+        self.now = 2
+        self.assertEqual([], self.watcher.scan())
+
+    def test_scan_restarts_settling_when_file_changes(self):
+        self.write_file('Name,Age')
+        self.watcher.scan()
+        self.now = 1
+        self.write_file(',DOB\n' * 10)
+        self.assertEqual([], self.watcher.scan())
+        self.now = 2
+        self.assertEqual([self.file_path], self.watcher.scan())
+
+    def test_scan_returns_retried_files_after_retry_delay(self):
+        self.watcher.retry_seconds = 5
+        self.write_file('Name,Age')
+        self.watcher.scan()
+        self.now = 1
+        self.watcher.scan()
+        self.watcher.retry(self.file_path)
+        self.now = 6
+        self.assertEqual([], self.watcher.scan())
+        self.now = 7
+        self.assertEqual([self.file_path], self.watcher.scan())
+
+    def test_scan_forgets_removed_files(self):
+        self.write_file('Name,Age')
+        self.watcher.scan()
+        os.remove(self.file_path)
+        self.watcher.scan()
+        self.assertEqual({}, self.watcher.files)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+@unittest.skipIf(load_inotify() is None, 'inotify is not available')
+class InotifyWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.existing_file = os.path.join(self.directory.name, 'Valid-0.csv')
+        with open(self.existing_file, 'w') as file:
+            file.write('Name,Age,DOB\n')
+        self.now = 0
+        self.watcher = InotifyWatcher([self.directory.name], load_inotify(), settle_seconds=1,
+                                      clock=lambda: self.now)
+
+    def test_poll_returns_existing_files_once_settled(self):
+        self.assertEqual([], self.watcher.poll(0))
+        self.now = 1
+        self.assertEqual([self.existing_file], self.watcher.poll(0))
+        self.now = 2
+        self.assertEqual([], self.watcher.poll(0))
+
+    def test_poll_waits_for_existing_files_still_being_written(self):
+        self.watcher.poll(0)
+        with open(self.existing_file, 'a') as file:
+            file.write('Jason,99,01/01/1970\n' * 10)
+            file.flush()
+            self.now = 1
+            self.assertEqual([], self.watcher.poll(0))
+        self.assertEqual([self.existing_file], self.watcher.poll(0))
+
+    def test_poll_settles_files_listed_after_queue_overflow(self):
+        self.watcher.poll(0)
+        self.now = 1
+        self.watcher.poll(0)
+        self.assertEqual([], self.watcher.parse_events(INOTIFY_EVENT.pack(-1, IN_Q_OVERFLOW, 0, 0)))
+        self.assertEqual([], self.watcher.poll(0))
+        self.now = 2
+        self.assertEqual([self.existing_file], self.watcher.poll(0))
+
+    def test_poll_returns_retried_files_after_retry_delay(self):
+        self.watcher.retry_seconds = 5
+        self.watcher.poll(0)
+        self.now = 1
+        self.watcher.poll(0)
+        self.watcher.retry(self.existing_file)
+        self.now = 6
+        self.assertEqual([], self.watcher.poll(0))
+        self.now = 7
+        self.assertEqual([self.existing_file], self.watcher.poll(0))
+        self.now = 8
+        self.assertEqual([], self.watcher.poll(0))
+
+    def test_poll_returns_files_when_closed_after_writing(self):
+        self.watcher.poll(0)
+        file_path = os.path.join(self.directory.name, 'Valid-1.csv')
+        with open(file_path, 'w') as file:
+            file.write('Name,Age,DOB\n')
+            self.assertEqual([], self.watcher.poll(0))
+        self.assertEqual([file_path], self.watcher.poll(1))
+
+    def test_poll_returns_renamed_files(self):
+        self.watcher.poll(0)
+        file_path = os.path.join(self.directory.name, 'Valid-2.csv')
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(self.directory.name), delete=False) as file:
+            file.write('Name,Age,DOB\n')
+        os.rename(file.name, file_path)
+        self.assertEqual([file_path], self.watcher.poll(1))
+
+    def tearDown(self):
+        self.watcher.close()
+        self.directory.cleanup()
@@ -0,0 +1,200 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import List
+
+
+INOTIFY_EVENT = struct.Struct('iIII')
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_READ_SIZE = 64 * 1024
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_RETRY_SECONDS = 60.0
+
+
+def list_files(directory: str) -> List[str]:
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries if entry.is_file()]
+
+
+def get_file_signature(stat: os.stat_result):
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    library_name = ctypes.util.find_library('c')
+    libc = ctypes.CDLL(library_name, use_errno=True) if library_name else None
+    if libc is None or not hasattr(libc, 'inotify_init1'):
+        return None
+    return libc
+
+
+def create_directory_watcher(directories: List[str], settle_seconds=DEFAULT_SETTLE_SECONDS,
+                             retry_seconds=DEFAULT_RETRY_SECONDS):
+    libc = load_inotify()
+    if libc is not None:
+        try:
+            return InotifyWatcher(directories, libc, settle_seconds, retry_seconds=retry_seconds)
+        except OSError:
+            pass
+    return ScandirWatcher(directories, settle_seconds, retry_seconds=retry_seconds)
+
+
+class SettlingFiles:
+    def __init__(self, settle_seconds=DEFAULT_SETTLE_SECONDS, clock=time.monotonic):
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self.files = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def add(self, file_paths: List[str]) -> None:
+        now = self.clock()
+        for file_path in file_paths:
+            self.files.setdefault(file_path, (None, now))
+
+    def defer(self, file_path: str, delay: float) -> None:
+        try:
+            signature = get_file_signature(os.stat(file_path))
+        except FileNotFoundError:
+            return
+        self.files[file_path] = (signature, self.clock() + delay)
+
+    def discard(self, file_path: str) -> None:
+        self.files.pop(file_path, None)
+
+    def pop_settled(self) -> List[str]:
+        now = self.clock()
+        ready = []
+        for file_path, (signature, since) in list(self.files.items()):
+            try:
+                current = get_file_signature(os.stat(file_path))
+            except FileNotFoundError:
+                del self.files[file_path]
+                continue
+            if current != signature:
+                self.files[file_path] = (current, now)
+            elif now - since >= self.settle_seconds:
+                del self.files[file_path]
+                ready.append(file_path)
+        return ready
+
+
+class InotifyWatcher:
+    def __init__(self, directories: List[str], libc, settle_seconds=DEFAULT_SETTLE_SECONDS, clock=time.monotonic,
+                 retry_seconds=DEFAULT_RETRY_SECONDS):
+        self.libc = libc
+        self.retry_seconds = retry_seconds
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self.directories = {}
+        for directory in directories:
+            watch = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if watch < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+            self.directories[watch] = directory
+        # files listed without a close or rename event may still be mid-write, so they have to settle first
+        self.settling = SettlingFiles(settle_seconds, clock)
+        self.settling.add([path for directory in directories for path in list_files(directory)])
+
+    def poll(self, timeout: float) -> List[str]:
+        ready = self.settling.pop_settled()
+        if ready:
+            timeout = 0
+        elif self.settling:
+            timeout = min(timeout, self.settling.settle_seconds)
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            try:
+                data = os.read(self.fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                data = b''
+            for file_path in self.parse_events(data):
+                self.settling.discard(file_path)
+                ready.append(file_path)
+        return list(dict.fromkeys(ready))
+
+    def parse_events(self, data: bytes) -> List[str]:
+        ready = []
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                self.settling.add([path for directory in self.directories.values() for path in list_files(directory)])
+            elif watch in self.directories and name:
+                ready.append(os.path.join(self.directories[watch], os.fsdecode(name)))
+        return list(dict.fromkeys(ready))
+
+    def retry(self, file_path: str) -> None:
+        # failed files get no further events until they change, so they go back through settling after a delay
+        self.settling.defer(file_path, self.retry_seconds)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ScandirWatcher:
+    def __init__(self, directories: List[str], settle_seconds=DEFAULT_SETTLE_SECONDS, clock=time.monotonic,
+                 retry_seconds=DEFAULT_RETRY_SECONDS):
+        self.directories = directories
+        self.settle_seconds = settle_seconds
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.files = {}
+        self.dispatched = set()
+
+    def poll(self, timeout: float) -> List[str]:
+        ready = self.scan()
+        if not ready and timeout:
+            time.sleep(timeout)
+        return ready
+
+    def scan(self) -> List[str]:
+        now = self.clock()
+        seen = set()
+        ready = []
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    signature = get_file_signature(entry.stat())
+                    seen.add(entry.path)
+
+                    previous = self.files.get(entry.path)
+                    if previous is None or previous[0] != signature:
+                        self.files[entry.path] = (signature, now)
+                        self.dispatched.discard(entry.path)
+                    elif now - previous[1] >= self.settle_seconds and entry.path not in self.dispatched:
+                        self.dispatched.add(entry.path)
+                        ready.append(entry.path)
+
+        for file_path in set(self.files) - seen:
+            del self.files[file_path]
+            self.dispatched.discard(file_path)
+        return ready
+
+    def retry(self, file_path: str) -> None:
+        if file_path in self.files:
+            signature, _ = self.files[file_path]
+            self.files[file_path] = (signature, self.clock() + self.retry_seconds)
+            self.dispatched.discard(file_path)
+
+    def close(self):
+        pass